@@ -0,0 +1,430 @@
+"""
+Planification des envois d'emails aux heures de meilleure conversion
+Exercice 1.1 - Extension de email_automation.py
+
+Ce script :
+1. Calcule pour chaque destinataire un créneau d'envoi à partir des meilleures heures
+   (analyse réseaux sociaux ou REQUÊTE 3 de analytics_queries.sql)
+2. Range les envois futurs dans une roue temporelle hiérarchique (insertion et
+   expiration en O(1), adaptée à des millions d'envois en attente)
+3. Persiste les envois planifiés (SQLite) pour survivre aux redémarrages
+4. Libère les envois de chaque créneau vers l'API Brevo au débit autorisé
+   (chaque envoi est réservé en base avant de partir : plusieurs `run` sur
+   la même base n'envoient jamais deux fois le même email)
+"""
+
+import argparse
+import hashlib
+import logging
+import sqlite3
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from email_automation import envoyer_email, generer_rapport, lire_inscrits
+
+logger = logging.getLogger(__name__)
+
+
+# Heures par défaut (heure, poids) si aucune source n'est disponible
+HEURES_PAR_DEFAUT = [(10, 1.0), (14, 1.0), (18, 1.0)]
+
+
+# ============================================
+# MEILLEURES HEURES D'ENVOI
+# ============================================
+
+def heures_depuis_social(fichier_etat: str, n: int = 5) -> List[Tuple[int, float]]:
+    """
+    Meilleures heures d'après l'analyse réseaux sociaux (social_analytics.py)
+
+    Returns:
+        Liste de (heure, poids) - poids = engagement moyen de l'heure
+    """
+    from social_analytics import SocialAnalytics
+
+    table = SocialAnalytics.load(fichier_etat).hourly_performance().head(n)
+    return [(int(h), float(v)) for h, v in table['Engagement Moyen'].items()]
+
+
+def heures_depuis_postgres(conn, n: int = 5) -> List[Tuple[int, float]]:
+    """
+    Meilleures heures d'après la REQUÊTE 3 (taux de conversion par heure des sessions)
+
+    Returns:
+        Liste de (heure, poids) - poids = taux de conversion de l'heure
+    """
+    query = """
+    SELECT
+      extract(hour from start_time)::int AS hour_of_day,
+      SUM(CASE WHEN converted THEN 1 ELSE 0 END)::float / NULLIF(COUNT(*),0) AS conversion_rate
+    FROM sessions
+    WHERE start_time >= date_trunc('month', now()) - interval '3 months'
+    GROUP BY hour_of_day
+    ORDER BY conversion_rate DESC
+    LIMIT %s
+    """
+    with conn.cursor() as cur:
+        cur.execute(query, (n,))
+        return [(int(h), float(rate or 0)) for h, rate in cur.fetchall()]
+
+
+def calculer_creneau(inscrit: Dict, heures: List[Tuple[int, float]],
+                     maintenant: datetime) -> datetime:
+    """
+    Créneau d'envoi d'un destinataire : prochaine occurrence d'une des meilleures heures
+
+    L'heure est choisie parmi les meilleures heures proportionnellement à leur
+    poids, à partir d'un hachage de l'email (stable d'un lancement à l'autre),
+    et la minute est répartie sur l'heure : la charge est étalée au lieu
+    d'arriver d'un bloc. Une colonne 'heure_preferee' dans l'inscrit est
+    prioritaire.
+    """
+    empreinte = int(hashlib.md5(inscrit.get('email', '').encode('utf-8')).hexdigest(), 16)
+
+    heure_preferee = inscrit.get('heure_preferee')
+    if heure_preferee not in (None, ''):
+        heure = int(heure_preferee)
+    else:
+        poids = [max(p, 0) for _, p in heures]
+        if sum(poids) <= 0:
+            # Aucun poids positif (ex: engagement nul partout) : heures équiprobables
+            poids = [1] * len(heures)
+        cible = (empreinte % 10000) / 10000 * sum(poids)
+        cumul = 0.0
+        heure = heures[-1][0]
+        for (h, _), p in zip(heures, poids):
+            cumul += p
+            if cible < cumul:
+                heure = h
+                break
+
+    minute = (empreinte // 10000) % 60
+    creneau = maintenant.replace(hour=heure, minute=minute, second=0, microsecond=0)
+    if creneau <= maintenant:
+        creneau += timedelta(days=1)
+    return creneau
+
+
+# ============================================
+# ROUE TEMPORELLE HIÉRARCHIQUE
+# ============================================
+
+class TimingWheel:
+    """
+    Roue temporelle hiérarchique
+
+    Le niveau 0 a `slots` cases d'un tick ; chaque niveau supérieur a des cases
+    `slots` fois plus larges. Un envoi est rangé dans le niveau le plus bas qui
+    couvre son échéance (O(1)). Quand le temps atteint le début d'une case
+    d'un niveau supérieur, son contenu redescend d'un niveau ; les cases du
+    niveau 0 arrivées à échéance passent dans la file des envois prêts.
+    """
+
+    def __init__(self, debut: float, tick: float = 60.0, slots: int = 64, niveaux: int = 4):
+        """
+        Args:
+            debut: Instant de départ (timestamp)
+            tick: Résolution en secondes (défaut: 1 minute)
+            slots: Cases par niveau
+            niveaux: Nombre de niveaux (64 cases × 4 niveaux d'une minute ≈ 32 ans)
+        """
+        self.tick = tick
+        self.slots = slots
+        self.current = int(debut // tick)
+        self.roues = [[[] for _ in range(slots)] for _ in range(niveaux)]
+        self.debordement = []
+        self.prets = deque()
+        self.taille = 0
+
+    def add(self, echeance: float, item):
+        """Ajouter un élément à échéance (timestamp) - O(1)"""
+        self._ranger(int(echeance // self.tick), item)
+
+    def _ranger(self, t: int, item):
+        if t <= self.current:
+            self.prets.append(item)
+            return
+        delta = t - self.current
+        largeur = 1
+        for roue in self.roues:
+            if delta < largeur * self.slots:
+                roue[(t // largeur) % self.slots].append((t, item))
+                self.taille += 1
+                return
+            largeur *= self.slots
+        self.debordement.append((t, item))
+        self.taille += 1
+
+    def advance(self, maintenant: float) -> int:
+        """
+        Avancer jusqu'à maintenant et rendre prêts les éléments échus
+
+        Returns:
+            Nombre d'éléments prêts (en attente dans self.prets)
+        """
+        cible = int(maintenant // self.tick)
+        while self.current < cible:
+            if self.taille == 0:
+                # Rien en attente : inutile de parcourir les ticks un à un
+                self.current = cible
+                break
+            self.current += 1
+
+            # Cascade du niveau le plus haut vers le plus bas
+            largeur = self.slots ** (len(self.roues) - 1)
+            if self.current % (largeur * self.slots) == 0 and self.debordement:
+                debordement, self.debordement = self.debordement, []
+                self._recaser(debordement)
+            for niveau in range(len(self.roues) - 1, 0, -1):
+                if self.current % largeur == 0:
+                    index = (self.current // largeur) % self.slots
+                    case = self.roues[niveau][index]
+                    self.roues[niveau][index] = []
+                    self._recaser(case)
+                largeur //= self.slots
+
+            case = self.roues[0][self.current % self.slots]
+            self.roues[0][self.current % self.slots] = []
+            self.taille -= len(case)
+            self.prets.extend(item for _, item in case)
+        return len(self.prets)
+
+    def _recaser(self, case: list):
+        self.taille -= len(case)
+        for t, item in case:
+            self._ranger(t, item)
+
+    def __len__(self):
+        return self.taille + len(self.prets)
+
+
+# ============================================
+# LIMITATION DE DÉBIT
+# ============================================
+
+class TokenBucket:
+    """Débit maximal vers l'API (jetons par seconde, rafale bornée)"""
+
+    def __init__(self, debit: float, rafale: int = 1):
+        self.debit = debit
+        self.rafale = rafale
+        self.jetons = float(rafale)
+        self.dernier = time.monotonic()
+
+    def attente(self) -> float:
+        """Secondes avant le prochain jeton disponible (0 si disponible)"""
+        maintenant = time.monotonic()
+        self.jetons = min(self.rafale, self.jetons + (maintenant - self.dernier) * self.debit)
+        self.dernier = maintenant
+        return 0.0 if self.jetons >= 1 else (1 - self.jetons) / self.debit
+
+    def consommer(self):
+        self.jetons -= 1
+
+
+# ============================================
+# PLANIFICATEUR
+# ============================================
+
+class SendScheduler:
+
+    def __init__(self, db_path: str = 'scheduled_sends.db', heures: List[Tuple[int, float]] = None,
+                 debit: float = 2.0, rafale: int = 1, sender=envoyer_email):
+        """
+        Args:
+            db_path: Base SQLite des envois planifiés (persistance)
+            heures: Meilleures heures (heure, poids) ; défaut HEURES_PAR_DEFAUT
+            debit: Envois par seconde autorisés par le fournisseur
+                   (2/s = la pause de 500 ms de email_automation.py)
+            rafale: Envois consécutifs autorisés sans attente
+            sender: Fonction d'envoi (email, prenom, date_inscription) -> résultat
+        """
+        self.heures = heures or HEURES_PAR_DEFAUT
+        self.sender = sender
+        self.bucket = TokenBucket(debit, rafale)
+        self.roue = TimingWheel(time.time())
+        self.resultats = []
+        self._dernier_id = 0  # plus grand id déjà chargé dans la roue
+
+        # timeout : attendre le verrou d'écriture d'un autre processus
+        self.db = sqlite3.connect(db_path, timeout=30)
+        self.db.execute("""
+        CREATE TABLE IF NOT EXISTS scheduled_sends (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT NOT NULL,
+            prenom TEXT,
+            date_inscription TEXT,
+            send_at REAL NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending'
+        )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_sends_status ON scheduled_sends(status)")
+        self.db.commit()
+
+        bloques = self.db.execute(
+            "SELECT COUNT(*) FROM scheduled_sends WHERE status = 'sending'"
+        ).fetchone()[0]
+        if bloques:
+            # Processus arrêté entre la réservation et la réponse de l'API :
+            # l'email est peut-être parti, à vérifier avant de le repasser en 'pending'
+            logger.warning(f"{bloques} envois restés à l'état 'sending'")
+        nb = self._charger_nouveaux()
+        if nb:
+            logger.info(f"{nb} envois en attente rechargés")
+
+    def _charger_nouveaux(self) -> int:
+        """
+        Ajouter à la roue les envois en attente pas encore chargés
+
+        Appelé à chaque tick : les envois planifiés par un autre processus
+        pendant un run sont pris en compte. Les id sont croissants (SQLite
+        n'a qu'un écrivain à la fois), un seul parcours par id suffit.
+
+        Returns:
+            Nombre d'envois ajoutés
+        """
+        nb = 0
+        for row in self.db.execute(
+            "SELECT id, email, prenom, date_inscription, send_at "
+            "FROM scheduled_sends WHERE status = 'pending' AND id > ? ORDER BY id",
+            (self._dernier_id,)
+        ):
+            self.roue.add(row[4], row[:4])
+            self._dernier_id = row[0]
+            nb += 1
+        self.db.commit()
+        return nb
+
+    def planifier(self, inscrits: List[Dict], maintenant: datetime = None) -> int:
+        """
+        Planifier un envoi par inscrit à son créneau optimal
+
+        Returns:
+            Nombre d'envois planifiés
+        """
+        maintenant = maintenant or datetime.now()
+        lignes = []
+        for inscrit in inscrits:
+            creneau = calculer_creneau(inscrit, self.heures, maintenant)
+            lignes.append((
+                inscrit.get('email', ''),
+                inscrit.get('prenom', 'Utilisateur'),
+                inscrit.get('date_inscription', 'N/A'),
+                creneau.timestamp(),
+            ))
+
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO scheduled_sends (email, prenom, date_inscription, send_at) "
+                "VALUES (?, ?, ?, ?)", lignes
+            )
+        self._charger_nouveaux()
+
+        logger.info(f"{len(lignes)} envois planifiés")
+        return len(lignes)
+
+    def _reserver(self, send_id: int) -> bool:
+        """Réserver un envoi (pending -> sending) ; False s'il a été pris par un autre run"""
+        cur = self.db.execute(
+            "UPDATE scheduled_sends SET status = 'sending' WHERE id = ? AND status = 'pending'",
+            (send_id,)
+        )
+        self.db.commit()
+        return cur.rowcount == 1
+
+    def _envoyer_prets(self, echeance: float):
+        """Envoyer les éléments prêts au débit autorisé, jusqu'à l'échéance"""
+        while self.roue.prets and time.time() < echeance:
+            attente = self.bucket.attente()
+            if attente > 0:
+                time.sleep(min(attente, max(0.0, echeance - time.time())))
+                continue
+            send_id, email, prenom, date_inscription = self.roue.prets.popleft()
+            if not self._reserver(send_id):
+                continue
+            self.bucket.consommer()
+            resultat = self.sender(email, prenom, date_inscription)
+            self.resultats.append(resultat)
+            statut = 'sent' if resultat.get('success') else 'failed'
+            self.db.execute("UPDATE scheduled_sends SET status = ? WHERE id = ?", (statut, send_id))
+            self.db.commit()
+
+    def run(self, duree: float = None, continu: bool = False):
+        """
+        Boucle principale : avancer la roue à chaque tick et libérer les envois
+
+        Args:
+            duree: Durée maximale en secondes (None = sans limite)
+            continu: Continuer à attendre de nouveaux envois quand la file est vide
+                     (sinon : arrêt une fois tous les envois partis)
+        """
+        fin = time.time() + duree if duree else None
+        logger.info(f"Planificateur démarré ({len(self.roue)} envois en attente)")
+        try:
+            while (continu or len(self.roue)) and (fin is None or time.time() < fin):
+                self._charger_nouveaux()
+                self.roue.advance(time.time())
+                prochain_tick = (self.roue.current + 1) * self.roue.tick
+                self._envoyer_prets(prochain_tick)
+                reste = prochain_tick - time.time()
+                if reste > 0 and not self.roue.prets:
+                    time.sleep(max(0.0, min(reste, fin - time.time())) if fin else reste)
+        except KeyboardInterrupt:
+            # Les envois non réservés restent 'pending' et seront rechargés
+            logger.info("Planificateur interrompu")
+        finally:
+            if self.resultats:
+                generer_rapport(self.resultats)
+                self.resultats = []
+
+
+def main():
+    """Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="Envois d'emails aux heures optimales")
+    parser.add_argument('action', choices=['planifier', 'run'])
+    parser.add_argument('--inscrits', default='inscrits.csv')
+    parser.add_argument('--source', choices=['social', 'postgres'], default='social',
+                        help="Meilleures heures : analyse réseaux sociaux ou taux de "
+                             "conversion par heure des sessions (REQUÊTE 3)")
+    parser.add_argument('--etat-social', default='social_aggregates.json',
+                        help="État de social_analytics.py pour les meilleures heures")
+    parser.add_argument('--db', default='scheduled_sends.db')
+    parser.add_argument('--debit', type=float, default=2.0, help="Envois par seconde")
+    parser.add_argument('--continu', action='store_true',
+                        help="run : attendre les nouveaux envois planifiés au lieu de s'arrêter")
+    args = parser.parse_args()
+
+    heures = None
+    if args.action == 'planifier' and args.source == 'postgres':
+        import psycopg2
+
+        conn = psycopg2.connect(
+            dbname="TP3_DB",
+            user="postgres",
+            password="0000",
+            host="localhost",
+            port="5432"
+        )
+        try:
+            heures = heures_depuis_postgres(conn)
+        finally:
+            conn.close()
+        print(f"Meilleures heures (conversion des sessions) : {[h for h, _ in heures]}")
+    elif args.action == 'planifier':
+        try:
+            heures = heures_depuis_social(args.etat_social)
+            print(f"Meilleures heures (réseaux sociaux) : {[h for h, _ in heures]}")
+        except FileNotFoundError:
+            print(f"{args.etat_social} introuvable : heures par défaut {[h for h, _ in HEURES_PAR_DEFAUT]}")
+
+    scheduler = SendScheduler(args.db, heures, debit=args.debit)
+    if args.action == 'planifier':
+        scheduler.planifier(lire_inscrits(args.inscrits))
+    else:
+        scheduler.run(continu=args.continu)
+
+
+if __name__ == '__main__':
+    main()
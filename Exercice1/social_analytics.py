@@ -0,0 +1,450 @@
+"""
+Moteur d'analyse des performances réseaux sociaux, en un seul passage
+Exercice 1.2 - Version industrialisée de analyse_reseaux_sociaux.ipynb
+
+Ce script :
+1. Lit les exports de posts (CSV) par lots, sans jamais charger le fichier entier
+2. Met à jour en un passage toutes les agrégations du notebook (heure, plateforme,
+   type de contenu, jour, jour × heure, global) sous forme de sommes fusionnables
+3. Garde le top des posts dans un tas de taille bornée
+4. Sauvegarde l'état (JSON) pour intégrer les nouveaux posts de façon incrémentale
+   (un export déjà intégré, reconnu à son empreinte, n'est pas recompté)
+
+Les agrégats sont des sommes : chaque export ne doit contenir que des posts
+non encore intégrés. Un export cumulatif (tout l'historique d'un compte, ré-exporté)
+a une autre empreinte et serait recompté en entier : exporter par période.
+Les post_id ne sont uniques qu'au sein d'un export (deux comptes réutilisent
+les mêmes numéros) : le top identifie un post par (empreinte de l'export, post_id).
+5. Génère les graphiques à partir des agrégats stockés
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# Colonnes sommées pour chaque clé (les moyennes sont dérivées : somme / posts)
+SOMMES = ['likes', 'comments', 'shares', 'reach', 'impressions',
+          'total_engagement', 'engagement_rate', 'engagement_rate_n']
+
+# Agrégations maintenues : nom -> colonnes de regroupement
+VUES = {
+    'global': [],
+    'hour': ['hour'],
+    'platform': ['platform'],
+    'content_type': ['content_type'],
+    'date': ['date'],
+    'day_of_week': ['day_of_week'],
+    'day_of_week_hour': ['day_of_week', 'hour'],
+}
+
+TOP_COLUMNS = ['post_id', 'platform', 'content_type', 'hour',
+               'total_engagement', 'engagement_rate', 'reach']
+
+DAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def preparer_lot(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ajouter les colonnes dérivées du notebook à un lot de posts
+
+    (hour, day_of_week, date, total_engagement, engagement_rate)
+    """
+    dates = pd.to_datetime(chunk['date'])
+    chunk = chunk.assign(
+        hour=dates.dt.hour,
+        day_of_week=dates.dt.day_name(),
+        date=dates.dt.strftime('%Y-%m-%d'),
+        total_engagement=chunk['likes'] + chunk['comments'] + chunk['shares'],
+    )
+    # Engagement rate (%) ; posts sans impressions exclus de la moyenne
+    impressions = chunk['impressions'].where(chunk['impressions'] > 0)
+    rate = chunk['total_engagement'] / impressions * 100
+    chunk['engagement_rate'] = rate.fillna(0)
+    chunk['engagement_rate_n'] = rate.notna().astype(np.int64)
+    return chunk
+
+
+def empreinte_fichier(path: str) -> str:
+    """Empreinte SHA-256 du contenu d'un export"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloc in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloc)
+    return h.hexdigest()
+
+
+class SocialAnalytics:
+
+    def __init__(self, top_k: int = 10):
+        """
+        Args:
+            top_k: Nombre de meilleurs posts conservés (par engagement rate)
+        """
+        self.top_k = top_k
+        self.vues = {}
+        self._top = []  # tas min de (engagement_rate, post_id, source, post)
+        self._top_ids = set()  # (source, post_id) des posts du top
+        self.nb_posts = 0
+        self.fichiers = {}  # empreinte -> {'path', 'posts'} des exports intégrés
+
+    # ============================================
+    # MISE À JOUR
+    # ============================================
+
+    def update(self, chunk: pd.DataFrame, source: str = None):
+        """
+        Intégrer un lot de nouveaux posts dans toutes les agrégations
+
+        Args:
+            source: Export d'origine (empreinte) ; un même post_id provenant
+                    de deux exports différents est un autre post
+        """
+        chunk = preparer_lot(chunk)
+
+        for vue, cles in VUES.items():
+            if cles:
+                groupes = chunk.groupby(cles, sort=False)
+                partiel = groupes[SOMMES].sum()
+                partiel['posts'] = groupes.size()
+            else:
+                partiel = chunk[SOMMES].sum().to_frame('all').T
+                partiel['posts'] = len(chunk)
+            self._fusionner(vue, partiel)
+
+        # Seuls les k meilleurs du lot peuvent entrer dans le top global
+        for post in chunk.nlargest(self.top_k, 'engagement_rate')[TOP_COLUMNS].to_dict('records'):
+            post['source'] = source
+            self._pousser_top(post)
+
+        self.nb_posts += len(chunk)
+
+    def _fusionner(self, vue: str, partiel: pd.DataFrame):
+        if vue in self.vues:
+            partiel = self.vues[vue].add(partiel, fill_value=0)
+            # add() repasse en float lorsqu'une clé manque d'un côté
+            partiel['posts'] = partiel['posts'].astype(np.int64)
+        self.vues[vue] = partiel
+
+    def _pousser_top(self, post: dict):
+        post = {k: (v.item() if hasattr(v, 'item') else v) for k, v in post.items()}
+        entree = (post['engagement_rate'], str(post['post_id']), post.get('source') or '', post)
+        cle = (entree[2], entree[1])
+        if cle in self._top_ids:
+            return
+        if len(self._top) < self.top_k:
+            heapq.heappush(self._top, entree)
+        elif entree[:3] > self._top[0][:3]:
+            sortant = heapq.heapreplace(self._top, entree)
+            self._top_ids.discard((sortant[2], sortant[1]))
+        else:
+            return
+        self._top_ids.add(cle)
+
+    def merge(self, autre: 'SocialAnalytics'):
+        """
+        Fusionner l'état d'un autre moteur (ex: un autre compte ou un autre worker)
+
+        Les posts du top gardent leur export d'origine : des post_id identiques
+        venant d'exports différents restent distincts.
+
+        Raises:
+            ValueError: Un même export a été intégré par les deux moteurs
+        """
+        communs = set(self.fichiers) & set(autre.fichiers)
+        if communs:
+            raise ValueError("Exports intégrés des deux côtés : "
+                             + ", ".join(self.fichiers[e]['path'] for e in communs))
+        for vue, df in autre.vues.items():
+            self._fusionner(vue, df)
+        for *_, post in autre._top:
+            self._pousser_top(post)
+        self.nb_posts += autre.nb_posts
+        self.fichiers.update(autre.fichiers)
+
+    def process_csv(self, fichier_csv: str, chunksize: int = 500000) -> int:
+        """
+        Lire un export CSV par lots et l'intégrer
+
+        Un export déjà intégré (même contenu, quel que soit son nom) est ignoré.
+        L'export ne doit contenir que des posts absents des exports déjà
+        intégrés : les posts d'un export cumulatif seraient comptés deux fois.
+
+        Returns:
+            Nombre de posts lus (0 si l'export était déjà intégré)
+        """
+        empreinte = empreinte_fichier(fichier_csv)
+        if empreinte in self.fichiers:
+            logger.info(f" {fichier_csv} déjà intégré "
+                        f"(comme {self.fichiers[empreinte]['path']}) : ignoré")
+            return 0
+
+        logger.info(f" Lecture de {fichier_csv} par lots de {chunksize}")
+        total = 0
+        for chunk in pd.read_csv(fichier_csv, chunksize=chunksize):
+            self.update(chunk, source=empreinte)
+            total += len(chunk)
+            logger.info(f"   → {total} posts intégrés")
+        self.fichiers[empreinte] = {'path': fichier_csv, 'posts': total}
+        return total
+
+    # ============================================
+    # PERSISTANCE DE L'ÉTAT
+    # ============================================
+
+    def save(self, path: str):
+        """Sauvegarder les agrégats et le top (JSON, écriture atomique)"""
+        etat = {
+            'top_k': self.top_k,
+            'nb_posts': self.nb_posts,
+            'vues': {vue: df.reset_index().to_dict('records') for vue, df in self.vues.items()},
+            'top': [post for *_, post in self._top],
+            'fichiers': self.fichiers,
+        }
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(etat, f, ensure_ascii=False, default=lambda v: v.item())
+        os.replace(tmp, path)
+        logger.info(f" État sauvegardé dans {path}")
+
+    @classmethod
+    def load(cls, path: str) -> 'SocialAnalytics':
+        """Recharger un état sauvegardé par save()"""
+        with open(path, 'r', encoding='utf-8') as f:
+            etat = json.load(f)
+        moteur = cls(top_k=etat['top_k'])
+        moteur.nb_posts = etat['nb_posts']
+        moteur.fichiers = etat.get('fichiers', {})
+        for vue, records in etat['vues'].items():
+            df = pd.DataFrame(records)
+            moteur.vues[vue] = df.set_index(VUES[vue] or 'index')
+            if not VUES[vue]:
+                moteur.vues[vue].index.name = None
+        for post in etat['top']:
+            moteur._pousser_top(post)
+        return moteur
+
+    # ============================================
+    # RÉSULTATS (mêmes tableaux que le notebook)
+    # ============================================
+
+    def _moyennes(self, vue: str) -> pd.DataFrame:
+        df = self.vues[vue]
+        moyennes = df[['likes', 'comments', 'shares', 'reach', 'impressions', 'total_engagement']].div(df['posts'], axis=0)
+        moyennes['engagement_rate'] = df['engagement_rate'] / df['engagement_rate_n'].replace(0, np.nan)
+        moyennes['posts'] = df['posts']
+        return moyennes
+
+    def metriques_globales(self) -> dict:
+        g = self.vues['global'].iloc[0]
+        moy = self._moyennes('global').iloc[0]
+        return {
+            'Nombre total de posts': int(g['posts']),
+            'Reach moyen': moy['reach'],
+            'Impressions moyennes': moy['impressions'],
+            'Engagement rate moyen (%)': moy['engagement_rate'],
+            'Likes moyens': moy['likes'],
+            'Commentaires moyens': moy['comments'],
+            'Partages moyens': moy['shares'],
+            'Engagement total': g['total_engagement'],
+        }
+
+    def hourly_performance(self) -> pd.DataFrame:
+        moy = self._moyennes('hour')
+        table = moy[['total_engagement', 'reach', 'engagement_rate', 'posts']].round(2)
+        table.columns = ['Engagement Moyen', 'Reach Moyen', 'Engagement Rate (%)', 'Nombre de Posts']
+        return table.sort_values('Engagement Moyen', ascending=False)
+
+    def best_hours(self, n: int = 3) -> list:
+        """Heures de publication avec le meilleur engagement moyen"""
+        return [int(h) for h in self.hourly_performance().head(n).index]
+
+    def platform_stats(self) -> pd.DataFrame:
+        df = self.vues['platform']
+        table = df[['posts', 'reach', 'impressions', 'total_engagement']].copy()
+        table['engagement_rate'] = self._moyennes('platform')['engagement_rate']
+        table[['likes', 'comments', 'shares']] = df[['likes', 'comments', 'shares']]
+        table.columns = ['Posts', 'Reach Total', 'Impressions', 'Engagement',
+                         'Engagement Rate (%)', 'Likes', 'Comments', 'Shares']
+        return table.round(2)
+
+    def content_stats(self) -> pd.DataFrame:
+        df = self.vues['content_type']
+        moy = self._moyennes('content_type')
+        table = pd.DataFrame({
+            'Nombre': df['posts'],
+            'Engagement Rate (%)': moy['engagement_rate'],
+            'Reach Moyen': moy['reach'],
+            'Engagement Total': df['total_engagement'],
+        }).round(2)
+        return table.sort_values('Engagement Rate (%)', ascending=False)
+
+    def top_posts(self) -> pd.DataFrame:
+        posts = [post for *_, post in sorted(self._top, key=lambda e: e[:3], reverse=True)]
+        return pd.DataFrame(posts, columns=TOP_COLUMNS)
+
+    # ============================================
+    # GRAPHIQUES (à partir des agrégats uniquement)
+    # ============================================
+
+    def plot_meilleurs_horaires(self, path: str = 'meilleurs_horaires.png'):
+        import matplotlib.pyplot as plt
+
+        moy = self._moyennes('hour').sort_index()
+        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
+
+        ax1.bar(moy.index, moy['total_engagement'], color='steelblue', alpha=0.8)
+        ax1.set_xlabel('Heure de la journée', fontsize=12, fontweight='bold')
+        ax1.set_ylabel('Engagement Moyen', fontsize=12, fontweight='bold')
+        ax1.set_title(' Engagement Moyen par Heure de Publication', fontsize=14, fontweight='bold')
+        ax1.grid(axis='y', alpha=0.3)
+        ax1.set_xticks(range(24))
+
+        ax2.plot(moy.index, moy['reach'], marker='o', linewidth=2, color='coral', markersize=8)
+        ax2.fill_between(moy.index, moy['reach'], alpha=0.3, color='coral')
+        ax2.set_xlabel('Heure de la journée', fontsize=12, fontweight='bold')
+        ax2.set_ylabel('Reach Moyen', fontsize=12, fontweight='bold')
+        ax2.set_title(' Reach Moyen par Heure de Publication', fontsize=14, fontweight='bold')
+        ax2.grid(alpha=0.3)
+        ax2.set_xticks(range(24))
+
+        plt.tight_layout()
+        plt.savefig(path, dpi=300, bbox_inches='tight')
+        plt.close(fig)
+
+    def plot_performance_plateforme(self, path: str = 'performance_par_plateforme.png'):
+        import matplotlib.pyplot as plt
+
+        df = self.vues['platform']
+        moy = self._moyennes('platform')
+        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
+
+        engagement = df['total_engagement'].sort_values()
+        ax1.barh(engagement.index, engagement.values, color='mediumseagreen')
+        ax1.set_xlabel('Engagement Total', fontsize=11, fontweight='bold')
+        ax1.set_title('📱 Engagement Total par Plateforme', fontsize=13, fontweight='bold')
+        ax1.grid(axis='x', alpha=0.3)
+
+        rate = moy['engagement_rate'].sort_values()
+        ax2.barh(rate.index, rate.values, color='mediumpurple')
+        ax2.set_xlabel('Engagement Rate Moyen (%)', fontsize=11, fontweight='bold')
+        ax2.set_title(' Engagement Rate Moyen par Plateforme', fontsize=13, fontweight='bold')
+        ax2.grid(axis='x', alpha=0.3)
+
+        counts = df['posts'].sort_values(ascending=False)
+        ax3.pie(counts.values, labels=counts.index, autopct='%1.1f%%',
+                colors=plt.cm.Set3(range(len(counts))), startangle=90)
+        ax3.set_title(' Distribution des Publications par Plateforme', fontsize=13, fontweight='bold')
+
+        x = np.arange(len(moy))
+        width = 0.35
+        ax4.bar(x - width/2, moy['reach'], width, label='Reach', color='skyblue')
+        ax4.bar(x + width/2, moy['impressions'], width, label='Impressions', color='lightcoral')
+        ax4.set_xlabel('Plateforme', fontsize=11, fontweight='bold')
+        ax4.set_ylabel('Nombre Moyen', fontsize=11, fontweight='bold')
+        ax4.set_title(' Reach vs Impressions Moyens par Plateforme', fontsize=13, fontweight='bold')
+        ax4.set_xticks(x)
+        ax4.set_xticklabels(moy.index, rotation=45, ha='right')
+        ax4.legend()
+        ax4.grid(axis='y', alpha=0.3)
+
+        plt.tight_layout()
+        plt.savefig(path, dpi=300, bbox_inches='tight')
+        plt.close(fig)
+
+    def plot_tendance(self, path: str = 'tendance_temporel.png'):
+        import matplotlib.pyplot as plt
+
+        quotidien = self.vues['date']['total_engagement'].sort_index()
+        heatmap = self._moyennes('day_of_week_hour')['engagement_rate'].unstack('hour')
+        heatmap = heatmap.reindex([d for d in DAY_ORDER if d in heatmap.index])
+        heatmap = heatmap.reindex(columns=sorted(heatmap.columns))
+
+        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(16, 10))
+
+        dates = pd.to_datetime(quotidien.index)
+        ax1.plot(dates, quotidien.values, marker='o', linewidth=2.5, color='darkblue', markersize=6)
+        ax1.fill_between(dates, quotidien.values, alpha=0.2, color='darkblue')
+        ax1.set_xlabel('Date', fontsize=12, fontweight='bold')
+        ax1.set_ylabel('Engagement Total', fontsize=12, fontweight='bold')
+        ax1.set_title(' Tendance de l\'Engagement par Jour', fontsize=14, fontweight='bold')
+        ax1.grid(alpha=0.3)
+
+        image = ax2.imshow(heatmap.values, aspect='auto', cmap='YlOrRd')
+        fig.colorbar(image, ax=ax2, label='Engagement Rate (%)')
+        ax2.set_xticks(range(len(heatmap.columns)))
+        ax2.set_xticklabels(heatmap.columns)
+        ax2.set_yticks(range(len(heatmap.index)))
+        ax2.set_yticklabels(heatmap.index)
+        ax2.set_xlabel('Heure de la journée', fontsize=12, fontweight='bold')
+        ax2.set_ylabel('Jour de la semaine', fontsize=12, fontweight='bold')
+        ax2.set_title(' Heatmap : Engagement Rate par Jour et Heure', fontsize=14, fontweight='bold')
+
+        plt.tight_layout()
+        plt.savefig(path, dpi=300, bbox_inches='tight')
+        plt.close(fig)
+
+    def plot_top_performers(self, path: str = 'Top_Performers.png'):
+        import matplotlib.pyplot as plt
+
+        top = self.top_posts()
+        colors_map = {'Facebook': 'blue', 'Instagram': 'purple', 'Twitter': 'skyblue', 'LinkedIn': 'orange'}
+        fig = plt.figure(figsize=(14, 6))
+        plt.barh(range(len(top)), top['engagement_rate'],
+                 color=[colors_map.get(p, 'gray') for p in top['platform']], alpha=0.7)
+        plt.yticks(range(len(top)), [f"{row.post_id} ({row.platform})" for row in top.itertuples()])
+        plt.xlabel('Engagement Rate (%)', fontsize=12, fontweight='bold')
+        plt.title(f' Top {self.top_k} des Posts par Engagement Rate', fontsize=14, fontweight='bold')
+        plt.grid(axis='x', alpha=0.3)
+        plt.tight_layout()
+        plt.savefig(path, dpi=300, bbox_inches='tight')
+        plt.close(fig)
+
+    def plot_all(self, dossier: str = '.'):
+        """Générer tous les graphiques du notebook"""
+        self.plot_meilleurs_horaires(os.path.join(dossier, 'meilleurs_horaires.png'))
+        self.plot_performance_plateforme(os.path.join(dossier, 'performance_par_plateforme.png'))
+        self.plot_tendance(os.path.join(dossier, 'tendance_temporel.png'))
+        self.plot_top_performers(os.path.join(dossier, 'Top_Performers.png'))
+        logger.info(f" Graphiques générés dans {dossier}")
+
+
+def main():
+    """Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="Analyse des performances réseaux sociaux")
+    parser.add_argument('csv', nargs='*', default=['social_posts.csv'],
+                        help="Exports de posts à intégrer, chacun limité aux posts non encore "
+                             "intégrés (pas d'export cumulatif : les agrégats s'additionnent)")
+    parser.add_argument('--etat', default='social_aggregates.json', help="Fichier d'état (agrégats)")
+    parser.add_argument('--chunksize', type=int, default=500000)
+    parser.add_argument('--graphiques', action='store_true', help="Générer les graphiques")
+    args = parser.parse_args()
+
+    moteur = SocialAnalytics.load(args.etat) if os.path.exists(args.etat) else SocialAnalytics()
+    for fichier in args.csv:
+        moteur.process_csv(fichier, args.chunksize)
+    moteur.save(args.etat)
+
+    print("\n PERFORMANCE PAR HEURE DE PUBLICATION :")
+    print("=" * 70)
+    print(moteur.hourly_performance().head(10))
+    print(f"\n Top 3 des meilleurs horaires : {moteur.best_hours(3)}h")
+
+    if args.graphiques:
+        moteur.plot_all()
+
+
+if __name__ == '__main__':
+    main()
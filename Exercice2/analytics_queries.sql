@@ -149,6 +149,36 @@ FROM cohort_activity
 GROUP BY cohort_month, month_number
 ORDER BY cohort_month, month_number;
 
+-- Version rapide : lecture de la matrice pré-agrégée, maintenue
+-- incrémentalement par cohort_retention.py (tables définies dans cohorts.sql)
+SELECT cohort_month, month_number, users_active
+FROM cohort_retention
+ORDER BY cohort_month, month_number;
+
+
+-- ============================================
+--  VERSIONS BORNÉES DANS LE TEMPS (schéma partitionné, voir partitioning.sql)
+-- ============================================
+
+-- Avec un filtre sur la colonne de partitionnement, PostgreSQL ne lit que les
+-- partitions mensuelles concernées (partition pruning) puis l'index BRIN.
+-- Top 5 des heures sur les 3 derniers mois :
+SELECT
+  extract(hour from start_time)::int AS hour_of_day,
+  SUM(CASE WHEN converted THEN 1 ELSE 0 END)::float / NULLIF(COUNT(*),0) AS conversion_rate
+FROM sessions
+WHERE start_time >= date_trunc('month', now()) - interval '3 months'
+GROUP BY hour_of_day
+ORDER BY conversion_rate DESC
+LIMIT 5;
+
+-- ARPU du mois précédent :
+SELECT
+  SUM(revenue)::numeric(12,2) / NULLIF(COUNT(DISTINCT user_id),0) AS arpu
+FROM events
+WHERE timestamp >= date_trunc('month', now()) - interval '1 month'
+  AND timestamp < date_trunc('month', now());
+
 
 -- Exercice 2.1.2 : Pipeline ETL avec Python 
 
@@ -0,0 +1,208 @@
+"""
+Scoring batch des sessions avec le modèle de conversion
+Exercice 2 - Exploitation en production du modèle de conversion
+
+Ce script :
+1. Charge le modèle une seule fois par processus (version du registre
+   model_registry.py, ou ancien artifact joblib conversion_model_<date>.pkl)
+2. Lit les sessions non encore scorées par lots (curseur côté serveur)
+3. Applique engineer_features + encodage vectorisés sur chaque lot
+4. Écrit les probabilités en masse dans session_scores via COPY (voir scoring.sql)
+"""
+
+import argparse
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+import psycopg2
+
+from data_loader import stream_query
+from features import encode_features, engineer_features
+from feature_store import FEATURE_COLUMNS
+from model_registry import ModelRegistry, load_artifact
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# Modèle chargé dans chaque processus de scoring (voir _init_worker)
+_ARTIFACTS = None
+
+
+def _init_worker(model_path: str, nthread: int):
+    """
+    Charger l'artifact une fois par processus
+
+    Raises:
+        ValueError: Artifact sans feature_stats (seuils recalculés sur chaque
+                    lot : les scores dépendraient du découpage en lots)
+    """
+    global _ARTIFACTS
+    if os.path.isdir(model_path):
+        artifacts = load_artifact(model_path)
+    else:
+        artifacts = joblib.load(model_path)
+    if 'feature_stats' not in artifacts:
+        raise ValueError(f"{model_path} ne contient pas 'feature_stats' : ré-entraîner le modèle "
+                         f"avec le notebook à jour pour figer les seuils")
+    _ARTIFACTS = artifacts
+    model = _ARTIFACTS['model']
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    # Plusieurs processus en parallèle : un thread XGBoost chacun
+    booster.set_param({'nthread': nthread})
+    _ARTIFACTS['booster'] = booster
+
+
+def _scorer_lot(lot: dict):
+    """
+    Scorer un lot de sessions
+
+    Returns:
+        (session_ids, probabilités float32)
+    """
+    df = pd.DataFrame(lot)
+    session_ids = df.pop('session_id').to_numpy()
+    # Seuils figés à l'entraînement
+    df = engineer_features(df, inplace=True, stats=_ARTIFACTS['feature_stats'])
+    X = encode_features(df, _ARTIFACTS['feature_names'])
+    probas = np.array(_ARTIFACTS['booster'].inplace_predict(X), dtype=np.float32)
+    return session_ids, probas
+
+
+class BatchScorer:
+
+    def __init__(self, model_path: str, db_config: dict = None, model_version: str = None):
+        """
+        Args:
+            model_path: Dossier d'une version du registre, ou artifact joblib
+            db_config: Paramètres de connexion PostgreSQL
+            model_version: Identifiant écrit dans session_scores
+                           (défaut: nom de la version / du fichier)
+        """
+        self.model_path = model_path
+        self.model_version = model_version or os.path.splitext(os.path.basename(model_path))[0]
+        self.db_config = db_config or {
+            'host': 'localhost',
+            'database': 'TP3_DB',
+            'user': 'postgres',
+            'password': '0000',
+            'port': '5432'
+        }
+
+    def _lots_non_scores(self, conn, chunksize: int):
+        """Sessions de session_features sans score pour la version courante"""
+        colonnes = [c for c in FEATURE_COLUMNS if c != 'converted']
+        query = f"""
+        SELECT {', '.join('f.' + c for c in colonnes)}
+        FROM session_features f
+        WHERE NOT EXISTS (
+            SELECT 1 FROM session_scores sc
+            WHERE sc.session_id = f.session_id AND sc.model_version = %(version)s
+        )
+        """
+        return stream_query(conn, query, {'version': self.model_version}, colonnes,
+                            chunksize, cursor_name='batch_scoring_cursor')
+
+    def _ecrire_scores(self, conn, session_ids, probas) -> int:
+        """Écrire un lot de scores avec COPY (une seule commande par lot)"""
+        buffer = io.StringIO()
+        pd.DataFrame({
+            'session_id': session_ids,
+            'model_version': self.model_version,
+            'probability': probas,
+        }).to_csv(buffer, sep='\t', header=False, index=False, float_format='%.6f')
+        buffer.seek(0)
+        with conn.cursor() as cur:
+            cur.copy_expert(
+                "COPY session_scores (session_id, model_version, probability) "
+                "FROM STDIN WITH (FORMAT text)",
+                buffer
+            )
+        conn.commit()
+        return len(session_ids)
+
+    def run(self, chunksize: int = 100000, n_workers: int = 1) -> int:
+        """
+        Scorer toutes les sessions non encore scorées
+
+        Args:
+            chunksize: Sessions par lot (un appel predict_proba par lot)
+            n_workers: Processus de scoring (1 = dans le processus courant,
+                       XGBoost utilisant alors tous les cœurs)
+
+        Returns:
+            Nombre de sessions scorées
+        """
+        logger.info(f" SCORING - Modèle {self.model_version}")
+        # Artifact chargé et vérifié avant d'ouvrir les connexions et les workers
+        _init_worker(self.model_path, nthread=(os.cpu_count() or 1) if n_workers <= 1 else 1)
+
+        # Deux connexions : le curseur nommé reste ouvert dans sa transaction
+        # pendant que les scores sont validés lot par lot sur l'autre
+        conn_lecture = psycopg2.connect(**self.db_config)
+        conn_ecriture = psycopg2.connect(**self.db_config)
+        total = 0
+        try:
+            lots = self._lots_non_scores(conn_lecture, chunksize)
+            if n_workers <= 1:
+                for lot in lots:
+                    total += self._ecrire_scores(conn_ecriture, *_scorer_lot(lot))
+                    logger.info(f"   → {total} sessions scorées")
+            else:
+                with ProcessPoolExecutor(
+                    max_workers=n_workers,
+                    initializer=_init_worker,
+                    initargs=(self.model_path, 1)
+                ) as pool:
+                    # Nombre de lots en vol borné : la mémoire reste proportionnelle à n_workers
+                    en_cours = []
+                    for lot in lots:
+                        en_cours.append(pool.submit(_scorer_lot, lot))
+                        if len(en_cours) >= 2 * n_workers:
+                            total += self._ecrire_scores(conn_ecriture, *en_cours.pop(0).result())
+                            logger.info(f"   → {total} sessions scorées")
+                    for future in en_cours:
+                        total += self._ecrire_scores(conn_ecriture, *future.result())
+        except Exception as e:
+            conn_ecriture.rollback()
+            logger.error(f"   ✗ Erreur: {e}")
+            raise
+        finally:
+            conn_lecture.close()
+            conn_ecriture.close()
+
+        logger.info(f"   ✓ {total} sessions scorées")
+        return total
+
+
+def main():
+    """Point d'entrée principal (scoring nocturne)"""
+    parser = argparse.ArgumentParser(description="Scoring batch des sessions")
+    parser.add_argument('--registry', default='model_registry',
+                        help="Dossier du registre (la version active est utilisée)")
+    parser.add_argument('--model-path', help="Version ou artifact joblib à utiliser à la place")
+    parser.add_argument('--chunksize', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    model_path = args.model_path
+    if model_path is None:
+        registry = ModelRegistry(args.registry)
+        version = registry.active_version()
+        if version is None:
+            raise SystemExit(f"Aucune version active dans {registry.path}")
+        model_path = os.path.join(registry.path, version)
+
+    BatchScorer(model_path).run(args.chunksize, args.workers)
+
+
+if __name__ == '__main__':
+    main()
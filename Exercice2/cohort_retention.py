@@ -0,0 +1,194 @@
+"""
+Rétention par cohorte à partir de tables maintenues incrémentalement
+Exercice 2 - Version rapide de la REQUÊTE 4 (voir cohorts.sql)
+
+Ce script :
+1. Intègre les nouveaux événements dans user_cohorts / user_activity
+2. Met à jour les compteurs de la matrice cohort_retention
+3. Renvoie la matrice cohorte × mois sans relire la table events
+"""
+
+import logging
+
+import pandas as pd
+import psycopg2
+
+from event_watermark import STATE_COLUMNS, bornes_evenements
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# Nombre de mois entre la cohorte et le mois d'activité.
+# (La REQUÊTE 4 utilisait DATE_PART('month', age(...)), qui repasse à 0 après 12 mois.)
+MONTH_NUMBER_SQL = """
+    ((EXTRACT(YEAR FROM a.activity_month) - EXTRACT(YEAR FROM c.cohort_month)) * 12
+     + EXTRACT(MONTH FROM a.activity_month) - EXTRACT(MONTH FROM c.cohort_month))::int
+"""
+
+
+class CohortStore:
+
+    def __init__(self, conn):
+        """
+        Args:
+            conn: Connexion psycopg2 ouverte
+        """
+        self.conn = conn
+
+    def refresh(self) -> int:
+        """
+        Intégrer les événements arrivés depuis le dernier passage
+
+        Seuls les événements au-dessus du filigrane sûr sont lus (voir
+        event_watermark.py) ; relire un événement déjà intégré ne change rien.
+        À lancer après chaque chargement d'événements (ETL, generate_data.py).
+
+        Les événements arrivés en retard avec une date antérieure à la cohorte
+        déjà enregistrée d'un utilisateur ne la modifient pas : utiliser
+        rebuild() après un import historique.
+
+        Returns:
+            Largeur de la plage d'event_id lue
+        """
+        logger.info(" COHORTES - Mise à jour incrémentale")
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(
+                    f"SELECT {STATE_COLUMNS} FROM cohort_refresh_state WHERE id FOR UPDATE"
+                )
+                last_id, max_id, etat = bornes_evenements(cur, *cur.fetchone())
+                if max_id <= last_id:
+                    self._enregistrer_etat(cur, etat)
+                    self.conn.commit()
+                    logger.info("   ✓ Aucun nouvel événement")
+                    return 0
+
+                bornes = {'last_id': last_id, 'max_id': max_id}
+
+                # 1. Nouveaux utilisateurs : mois de première apparition
+                cur.execute("""
+                INSERT INTO user_cohorts (user_id, cohort_month)
+                SELECT user_id, date_trunc('month', MIN(timestamp))::date
+                FROM events
+                WHERE event_id > %(last_id)s AND event_id <= %(max_id)s
+                  AND user_id IS NOT NULL
+                GROUP BY user_id
+                ON CONFLICT (user_id) DO NOTHING
+                """, bornes)
+                nouveaux_users = cur.rowcount
+
+                # 2. Nouveaux mois d'activité, reportés directement dans la matrice
+                cur.execute(f"""
+                WITH nouvelles_activites AS (
+                    INSERT INTO user_activity (user_id, activity_month)
+                    SELECT DISTINCT user_id, date_trunc('month', timestamp)::date
+                    FROM events
+                    WHERE event_id > %(last_id)s AND event_id <= %(max_id)s
+                      AND user_id IS NOT NULL
+                    ON CONFLICT DO NOTHING
+                    RETURNING user_id, activity_month
+                ),
+                increments AS (
+                    SELECT c.cohort_month, {MONTH_NUMBER_SQL} AS month_number, COUNT(*) AS nb
+                    FROM nouvelles_activites a
+                    JOIN user_cohorts c ON c.user_id = a.user_id
+                    GROUP BY 1, 2
+                )
+                INSERT INTO cohort_retention (cohort_month, month_number, users_active)
+                SELECT cohort_month, month_number, nb FROM increments
+                ON CONFLICT (cohort_month, month_number) DO UPDATE
+                SET users_active = cohort_retention.users_active + EXCLUDED.users_active
+                """, bornes)
+
+                self._enregistrer_etat(cur, etat)
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"   ✗ Erreur: {e}")
+            raise
+
+        logger.info(f"   ✓ Événements {last_id + 1} à {max_id} intégrés "
+                    f"({nouveaux_users} nouveaux utilisateurs)")
+        return max_id - last_id
+
+    @staticmethod
+    def _enregistrer_etat(cur, etat: tuple):
+        cur.execute(
+            "UPDATE cohort_refresh_state SET last_event_id = %s, pending_event_id = %s, "
+            "pending_xmax = %s, updated_at = NOW() WHERE id",
+            etat
+        )
+
+    def rebuild(self):
+        """Reconstruire entièrement les tables de cohortes (import historique, correction)"""
+        logger.info(" COHORTES - Reconstruction complète")
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("TRUNCATE user_cohorts, user_activity, cohort_retention")
+                cur.execute("UPDATE cohort_refresh_state SET last_event_id = 0, "
+                            "pending_event_id = NULL, pending_xmax = NULL WHERE id")
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"   ✗ Erreur: {e}")
+            raise
+        return self.refresh()
+
+    def get_retention_matrix(self, en_pourcentage: bool = False) -> pd.DataFrame:
+        """
+        Matrice de rétention cohorte × mois
+
+        Lit uniquement la table pré-agrégée cohort_retention (quelques
+        centaines de lignes), quel que soit le volume de la table events.
+
+        Args:
+            en_pourcentage: Diviser par la taille de la cohorte (mois 0)
+
+        Returns:
+            DataFrame indexé par cohort_month, une colonne par month_number
+        """
+        with self.conn.cursor() as cur:
+            cur.execute(
+                "SELECT cohort_month, month_number, users_active "
+                "FROM cohort_retention ORDER BY cohort_month, month_number"
+            )
+            rows = cur.fetchall()
+        self.conn.commit()
+
+        matrice = pd.DataFrame(rows, columns=['cohort_month', 'month_number', 'users_active'])
+        matrice = matrice.pivot(index='cohort_month', columns='month_number', values='users_active')
+        if en_pourcentage and 0 in matrice.columns:
+            matrice = matrice.div(matrice[0], axis=0) * 100
+        return matrice
+
+
+def get_retention_matrix(conn, en_pourcentage: bool = False) -> pd.DataFrame:
+    """Raccourci : matrice de rétention depuis une connexion ouverte"""
+    return CohortStore(conn).get_retention_matrix(en_pourcentage)
+
+
+def main():
+    """Point d'entrée principal : mise à jour puis affichage de la matrice"""
+    conn = psycopg2.connect(
+        dbname="TP3_DB",
+        user="postgres",
+        password="0000",
+        host="localhost",
+        port="5432"
+    )
+    try:
+        store = CohortStore(conn)
+        store.refresh()
+        print("\n RÉTENTION PAR COHORTE (%)")
+        print("=" * 60)
+        print(store.get_retention_matrix(en_pourcentage=True).round(1))
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+-- Exercice 2 : Tables de cohortes maintenues incrémentalement
+-- ============================================
+-- Remplace le recalcul complet de la REQUÊTE 4 (MIN(timestamp) GROUP BY
+-- user_id sur toute la table events à chaque exécution).
+-- Les tables sont alimentées par cohort_retention.py (CohortStore.refresh),
+-- qui ne lit que les événements arrivés depuis le dernier passage.
+-- ============================================
+
+-- Mois de première apparition de chaque utilisateur
+CREATE TABLE IF NOT EXISTS user_cohorts (
+    user_id VARCHAR(50) PRIMARY KEY,
+    cohort_month DATE NOT NULL
+);
+
+-- Mois d'activité de chaque utilisateur (une ligne par utilisateur et par mois)
+CREATE TABLE IF NOT EXISTS user_activity (
+    user_id VARCHAR(50),
+    activity_month DATE,
+    PRIMARY KEY (user_id, activity_month)
+);
+
+-- Matrice de rétention pré-agrégée : utilisateurs actifs par cohorte et
+-- par nombre de mois écoulés depuis la cohorte
+CREATE TABLE IF NOT EXISTS cohort_retention (
+    cohort_month DATE,
+    month_number INT,
+    users_active INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (cohort_month, month_number)
+);
+
+-- Filigrane des event_id intégrés dans les tables ci-dessus (voir event_watermark.py)
+CREATE TABLE IF NOT EXISTS cohort_refresh_state (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    last_event_id BIGINT NOT NULL DEFAULT 0,
+    pending_event_id BIGINT,
+    pending_xmax BIGINT,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+ALTER TABLE cohort_refresh_state ADD COLUMN IF NOT EXISTS pending_event_id BIGINT;
+ALTER TABLE cohort_refresh_state ADD COLUMN IF NOT EXISTS pending_xmax BIGINT;
+INSERT INTO cohort_refresh_state (id) VALUES (TRUE) ON CONFLICT DO NOTHING;
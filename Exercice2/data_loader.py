@@ -0,0 +1,217 @@
+"""
+Chargement des données d'entraînement par lots, directement en types compacts
+Exercice 2 - Remplace le pd.read_sql unique du notebook
+
+Ce script :
+1. Lit session_features via un curseur nommé (côté serveur), par lots
+2. Convertit chaque lot en colonnes float32 / int8 / category
+3. Met le résultat en cache Parquet pour les exécutions suivantes
+"""
+
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from feature_store import FEATURE_COLUMNS
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# Type cible de chaque colonne (None = chaîne conservée telle quelle).
+# Les compteurs (COUNT, bigint côté SQL) restent en int32 : une session
+# robot peut dépasser 32767 pages ou événements
+COLUMN_DTYPES = {
+    'session_id': None,
+    'time_on_site': np.float32,
+    'pages_viewed': np.int32,
+    'source': 'category',
+    'device': 'category',
+    'hour_of_day': np.int8,
+    'day_of_week': np.int8,
+    'total_events': np.int32,
+    'add_to_cart_count': np.int32,
+    'page_view_count': np.int32,
+    'converted': np.int8,
+}
+
+
+def _convertir_colonne(valeurs: tuple, dtype):
+    """Convertir les valeurs d'une colonne d'un lot vers son type compact"""
+    if dtype is None:
+        return np.asarray(valeurs, dtype=object)
+    if dtype == 'category':
+        return pd.Categorical(valeurs)
+    if np.issubdtype(dtype, np.floating):
+        return np.asarray(valeurs, dtype=np.float64).astype(dtype)
+    # Entiers : les NULL (ex: session sans end_time) deviennent 0
+    return np.asarray([0 if v is None else v for v in valeurs], dtype=dtype)
+
+
+def _concatener(morceaux: list, dtype):
+    """Assembler les lots d'une colonne en un seul tableau"""
+    if dtype == 'category':
+        return pd.Categorical(union_categoricals(morceaux))
+    return np.concatenate(morceaux)
+
+
+def stream_query(conn, query: str, params: dict, colonnes: list,
+                 chunksize: int = 100000, cursor_name: str = 'training_data_cursor'):
+    """
+    Générateur de lots typés lus via un curseur côté serveur
+
+    Seul le lot courant est matérialisé côté Python : le résultat de la
+    requête reste sur le serveur PostgreSQL.
+
+    Args:
+        query: Requête dont les colonnes sont, dans l'ordre, celles de colonnes
+        colonnes: Noms des colonnes (clés de COLUMN_DTYPES)
+
+    Yields:
+        Dictionnaire {colonne: tableau typé} pour chaque lot
+    """
+    with conn.cursor(name=cursor_name) as cur:
+        cur.itersize = chunksize
+        cur.execute(query, params)
+        while True:
+            rows = cur.fetchmany(chunksize)
+            if not rows:
+                break
+            valeurs = list(zip(*rows))
+            del rows
+            yield {
+                col: _convertir_colonne(valeurs[i], COLUMN_DTYPES[col])
+                for i, col in enumerate(colonnes)
+            }
+    conn.commit()
+
+
+def stream_training_data(conn, date_debut=None, date_fin=None,
+                         chunksize: int = 100000, with_session_id: bool = True):
+    """
+    Générateur de lots typés de session_features (voir stream_query)
+
+    Yields:
+        Dictionnaire {colonne: tableau typé} pour chaque lot
+    """
+    colonnes = [c for c in FEATURE_COLUMNS if with_session_id or c != 'session_id']
+
+    conditions = []
+    params = {}
+    if date_debut is not None:
+        conditions.append("start_time >= %(date_debut)s")
+        params['date_debut'] = date_debut
+    if date_fin is not None:
+        conditions.append("start_time < %(date_fin)s")
+        params['date_fin'] = date_fin
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"SELECT {', '.join(colonnes)} FROM session_features {where}"
+
+    yield from stream_query(conn, query, params, colonnes, chunksize)
+
+
+def _dernier_refresh(conn):
+    """Date du dernier FeatureStore.refresh() (None si inconnue)"""
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT last_refresh FROM feature_store_state WHERE id")
+            row = cur.fetchone()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        return None
+    return None if row is None or row[0] is None else str(row[0])
+
+
+def _parametres_cache(conn, date_debut, date_fin, with_session_id: bool) -> dict:
+    """
+    Paramètres de la requête enregistrés à côté du cache (<cache_path>.json)
+
+    Le dernier refresh du feature store en fait partie : après une mise à
+    jour de session_features, le cache n'est plus servi.
+    """
+    return {
+        'date_debut': None if date_debut is None else str(date_debut),
+        'date_fin': None if date_fin is None else str(date_fin),
+        'with_session_id': bool(with_session_id),
+        'feature_store_refresh': _dernier_refresh(conn),
+    }
+
+
+def _cache_valide(cache_path: str, parametres: dict) -> bool:
+    """Le cache a-t-il été écrit pour les mêmes bornes et le même état du feature store
+    (et avec session_id si demandé) ?"""
+    try:
+        with open(cache_path + '.json', 'r', encoding='utf-8') as f:
+            enregistres = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return False
+    return (parametres['feature_store_refresh'] is not None
+            and enregistres.get('feature_store_refresh') == parametres['feature_store_refresh']
+            and enregistres.get('date_debut') == parametres['date_debut']
+            and enregistres.get('date_fin') == parametres['date_fin']
+            and (enregistres.get('with_session_id') or not parametres['with_session_id']))
+
+
+def load_training_data(conn, date_debut=None, date_fin=None, chunksize: int = 100000,
+                       cache_path: str = None, refresh_cache: bool = False,
+                       with_session_id: bool = True) -> pd.DataFrame:
+    """
+    Charger les features d'entraînement en types compacts
+
+    Args:
+        conn: Connexion psycopg2 ouverte
+        date_debut, date_fin: Bornes optionnelles sur start_time
+        chunksize: Nombre de lignes par lot
+        cache_path: Fichier Parquet de cache (lu s'il a été écrit pour les
+                    mêmes paramètres et depuis le dernier refresh du feature
+                    store, réécrit sinon)
+        refresh_cache: Ignorer le cache existant et le réécrire
+        with_session_id: Garder la colonne session_id (chaînes)
+
+    Returns:
+        DataFrame avec les colonnes de FEATURE_COLUMNS
+    """
+    parametres = _parametres_cache(conn, date_debut, date_fin, with_session_id)
+    if cache_path and os.path.exists(cache_path) and not refresh_cache:
+        if _cache_valide(cache_path, parametres):
+            logger.info(f" Chargement depuis le cache {cache_path}")
+            df = pd.read_parquet(cache_path)
+            if not with_session_id and 'session_id' in df.columns:
+                df = df.drop(columns=['session_id'])
+            return df
+        logger.info(f" Cache {cache_path} écrit pour d'autres paramètres : rechargement")
+
+    morceaux = {}
+    nb_lignes = 0
+    for lot in stream_training_data(conn, date_debut, date_fin, chunksize, with_session_id):
+        for col, valeurs in lot.items():
+            morceaux.setdefault(col, []).append(valeurs)
+        nb_lignes += len(next(iter(lot.values())))
+        logger.info(f"   → {nb_lignes} lignes chargées")
+
+    colonnes = [c for c in FEATURE_COLUMNS if with_session_id or c != 'session_id']
+    data = {}
+    for col in colonnes:
+        # Libérer les lots au fur et à mesure de l'assemblage
+        data[col] = _concatener(morceaux.pop(col, []), COLUMN_DTYPES[col]) if nb_lignes else []
+    df = pd.DataFrame(data, columns=colonnes)
+    logger.info(f"   ✓ {len(df)} lignes, {df.memory_usage(deep=True).sum() / 1e6:.1f} Mo")
+
+    if cache_path:
+        try:
+            df.to_parquet(cache_path, index=False)
+            with open(cache_path + '.json', 'w', encoding='utf-8') as f:
+                json.dump(parametres, f)
+            logger.info(f"   ✓ Cache écrit: {cache_path}")
+        except ImportError as e:
+            # pyarrow / fastparquet non installé : on continue sans cache
+            logger.warning(f"  Cache Parquet indisponible: {e}")
+    return df
@@ -0,0 +1,49 @@
+"""
+Filigrane (watermark) sur events.event_id pour les mises à jour incrémentales
+Exercice 2 - Utilisé par cohort_retention.py et feature_store.py
+
+Un event_id SERIAL est attribué à l'insertion, pas au commit : un événement
+d'id inférieur au MAX(event_id) visible peut encore appartenir à une
+transaction en cours. Le filigrane « sûr » n'avance donc jusqu'à un MAX(event_id)
+qu'une fois terminées toutes les transactions en cours au moment où il a été lu.
+Entre-temps, les événements au-dessus du filigrane sûr sont relus à chaque
+passage : les mises à jour qui les consomment doivent être idempotentes.
+"""
+
+# État enregistré par les tables *_state :
+# - last_event_id    : filigrane sûr (tous les événements <= sont intégrés)
+# - pending_event_id : MAX(event_id) lu lors du dernier passage
+# - pending_xmax     : xmax du snapshot de ce passage ; pending_event_id devient
+#                      sûr quand le xmin d'un snapshot ultérieur l'atteint
+STATE_COLUMNS = 'last_event_id, pending_event_id, pending_xmax'
+
+
+def bornes_evenements(cur, last_id: int, pending_id: int = None, pending_xmax: int = None):
+    """
+    Bornes des événements à (re)lire et nouvel état du filigrane
+
+    Args:
+        cur: Curseur dans la transaction de mise à jour
+        last_id, pending_id, pending_xmax: État enregistré (STATE_COLUMNS)
+
+    Returns:
+        (debut, fin, etat) : lire event_id > debut AND event_id <= fin, puis
+        enregistrer etat = (last_event_id, pending_event_id, pending_xmax)
+    """
+    # Même snapshot pour le MAX et pour la liste des transactions en cours
+    cur.execute("""
+    SELECT (SELECT COALESCE(MAX(event_id), 0) FROM events),
+           pg_snapshot_xmin(snap)::text::bigint,
+           pg_snapshot_xmax(snap)::text::bigint,
+           NOT EXISTS (SELECT 1 FROM pg_snapshot_xip(snap))
+    FROM pg_current_snapshot() AS snap
+    """)
+    max_id, xmin, xmax, aucune_en_cours = cur.fetchone()
+
+    if pending_id is not None and xmin >= pending_xmax:
+        last_id = max(last_id, pending_id)
+
+    if aucune_en_cours:
+        # Aucune autre transaction en cours : tout ce qui est <= max_id est définitif
+        return last_id, max_id, (max_id, None, None)
+    return last_id, max_id, (last_id, max_id, xmax)
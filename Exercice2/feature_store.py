@@ -0,0 +1,262 @@
+"""
+Feature store par session pour le modèle de conversion
+Exercice 2 - Features ML pré-calculées (voir feature_store.sql)
+
+Ce script :
+1. Rattache les événements historiques à leur session (session_id)
+2. Maintient incrémentalement la table session_features
+3. Sert les features pour l'entraînement et le scoring (lecture indexée)
+"""
+
+import logging
+
+import pandas as pd
+import psycopg2
+
+from event_watermark import STATE_COLUMNS, bornes_evenements
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# Colonnes servies au modèle, dans l'ordre de l'ancienne requête du notebook
+FEATURE_COLUMNS = [
+    'session_id', 'time_on_site', 'pages_viewed', 'source', 'device',
+    'hour_of_day', 'day_of_week', 'total_events', 'add_to_cart_count',
+    'page_view_count', 'converted'
+]
+
+# Les sessions récentes peuvent encore évoluer (end_time, converted) :
+# elles sont recalculées à chaque passage pendant cette fenêtre
+FENETRE_RECALCUL = '1 day'
+
+# Un événement peut être horodaté après le end_time de sa session
+# (ex: add_to_cart à start_time + 5 min dans generate_data.py pour une
+# session de 1 à 4 min) : tolérance du rattachement après end_time
+TOLERANCE_RATTACHEMENT = '10 minutes'
+
+
+class FeatureStore:
+
+    def __init__(self, conn):
+        """
+        Args:
+            conn: Connexion psycopg2 ouverte
+        """
+        self.conn = conn
+
+    def lier_evenements(self, taille_lot: int = 100000) -> int:
+        """
+        Renseigner session_id sur les événements qui n'en ont pas
+
+        Pour les données chargées avant l'ajout de la colonne : un événement
+        appartient à la dernière session du même utilisateur commencée avant
+        son timestamp, s'il tombe avant end_time + TOLERANCE_RATTACHEMENT.
+        Les nouveaux événements reçoivent leur session_id dès l'insertion.
+
+        Returns:
+            Nombre d'événements rattachés
+        """
+        logger.info(" FEATURE STORE - Rattachement des événements aux sessions")
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT COALESCE(MIN(event_id), 0), COALESCE(MAX(event_id), 0) "
+                        "FROM events WHERE session_id IS NULL")
+            debut, fin = cur.fetchone()
+        self.conn.commit()
+
+        total = 0
+        while debut and debut <= fin:
+            try:
+                with self.conn.cursor() as cur:
+                    cur.execute(f"""
+                    UPDATE events e
+                    SET session_id = m.session_id
+                    FROM (
+                        SELECT ev.event_id, s.session_id
+                        FROM events ev
+                        CROSS JOIN LATERAL (
+                            SELECT session_id, end_time
+                            FROM sessions
+                            WHERE user_id = ev.user_id
+                              AND start_time <= ev.timestamp
+                            ORDER BY start_time DESC
+                            LIMIT 1
+                        ) s
+                        WHERE ev.session_id IS NULL
+                          AND ev.event_id >= %s AND ev.event_id < %s
+                          AND ev.timestamp <= s.end_time + interval '{TOLERANCE_RATTACHEMENT}'
+                    ) m
+                    WHERE e.event_id = m.event_id
+                    """, (debut, debut + taille_lot))
+                    total += cur.rowcount
+                self.conn.commit()
+            except Exception as e:
+                self.conn.rollback()
+                logger.error(f"   ✗ Erreur: {e}")
+                raise
+            debut += taille_lot
+
+        with self.conn.cursor() as cur:
+            if total:
+                # Événements historiques (sous le filigrane) : recalcul complet
+                # des sessions au prochain refresh
+                cur.execute("UPDATE feature_store_state SET last_refresh = NULL WHERE id")
+            cur.execute("SELECT COUNT(*) FROM events WHERE session_id IS NULL")
+            restants = cur.fetchone()[0]
+        self.conn.commit()
+
+        logger.info(f"   ✓ {total} événements rattachés")
+        if restants:
+            logger.warning(f"  {restants} événements sans session (hors de toute session "
+                           f"+ {TOLERANCE_RATTACHEMENT})")
+        return total
+
+    def refresh(self) -> int:
+        """
+        Mettre à jour session_features
+
+        Ne sont recalculées que les sessions ayant reçu des événements
+        au-dessus du filigrane sûr (voir event_watermark.py ; un recalcul
+        répété donne le même résultat), ainsi que les sessions récentes
+        (FENETRE_RECALCUL) absentes ou susceptibles d'avoir changé.
+        Chaque recalcul lit les événements de la session via l'index sur
+        events.session_id.
+
+        Returns:
+            Nombre de sessions recalculées
+        """
+        logger.info(" FEATURE STORE - Mise à jour de session_features")
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(
+                    f"SELECT {STATE_COLUMNS}, last_refresh, NOW()::timestamp "
+                    f"FROM feature_store_state WHERE id FOR UPDATE"
+                )
+                *filigrane, last_refresh, maintenant = cur.fetchone()
+                last_id, max_id, etat = bornes_evenements(cur, *filigrane)
+
+                cur.execute(f"""
+                WITH a_recalculer AS (
+                    SELECT DISTINCT session_id
+                    FROM events
+                    WHERE event_id > %(last_id)s AND event_id <= %(max_id)s
+                      AND session_id IS NOT NULL
+                    UNION
+                    SELECT session_id
+                    FROM sessions
+                    WHERE %(last_refresh)s::timestamp IS NULL
+                       OR start_time >= %(last_refresh)s::timestamp - interval '{FENETRE_RECALCUL}'
+                ),
+                features AS (
+                    SELECT
+                        s.session_id,
+                        s.start_time,
+                        EXTRACT(EPOCH FROM (s.end_time - s.start_time))/60 AS time_on_site,
+                        s.pages_viewed,
+                        s.channel AS source,
+                        COALESCE(MAX(e.properties->>'device'), 'unknown') AS device,
+                        EXTRACT(HOUR FROM s.start_time) AS hour_of_day,
+                        EXTRACT(DOW FROM s.start_time) AS day_of_week,
+                        COUNT(e.event_id) AS total_events,
+                        COUNT(*) FILTER (WHERE e.event_type = 'add_to_cart') AS add_to_cart_count,
+                        COUNT(*) FILTER (WHERE e.event_type = 'page_view') AS page_view_count,
+                        s.converted::int AS converted
+                    FROM a_recalculer r
+                    JOIN sessions s ON s.session_id = r.session_id
+                    -- Borne sur timestamp : seules les partitions postérieures
+                    -- au début de la session sont lues (events partitionnée)
+                    LEFT JOIN events e ON e.session_id = s.session_id
+                                      AND e.timestamp >= s.start_time
+                    GROUP BY s.session_id, s.start_time, s.end_time,
+                             s.pages_viewed, s.channel, s.converted
+                )
+                INSERT INTO session_features (
+                    session_id, start_time, time_on_site, pages_viewed, source, device,
+                    hour_of_day, day_of_week, total_events, add_to_cart_count,
+                    page_view_count, converted, updated_at
+                )
+                SELECT f.*, NOW() FROM features f
+                ON CONFLICT (session_id) DO UPDATE SET
+                    start_time = EXCLUDED.start_time,
+                    time_on_site = EXCLUDED.time_on_site,
+                    pages_viewed = EXCLUDED.pages_viewed,
+                    source = EXCLUDED.source,
+                    device = EXCLUDED.device,
+                    hour_of_day = EXCLUDED.hour_of_day,
+                    day_of_week = EXCLUDED.day_of_week,
+                    total_events = EXCLUDED.total_events,
+                    add_to_cart_count = EXCLUDED.add_to_cart_count,
+                    page_view_count = EXCLUDED.page_view_count,
+                    converted = EXCLUDED.converted,
+                    updated_at = EXCLUDED.updated_at
+                """, {'last_id': last_id, 'max_id': max_id, 'last_refresh': last_refresh})
+                nb = cur.rowcount
+
+                cur.execute(
+                    "UPDATE feature_store_state SET last_event_id = %s, pending_event_id = %s, "
+                    "pending_xmax = %s, last_refresh = %s WHERE id",
+                    (*etat, maintenant)
+                )
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"   ✗ Erreur: {e}")
+            raise
+
+        logger.info(f"   ✓ {nb} sessions mises à jour")
+        return nb
+
+    def get_training_data(self, date_debut=None, date_fin=None) -> pd.DataFrame:
+        """
+        Features de toutes les sessions (optionnellement bornées sur start_time)
+
+        Returns:
+            DataFrame avec les colonnes FEATURE_COLUMNS
+        """
+        conditions = []
+        params = {}
+        if date_debut is not None:
+            conditions.append("start_time >= %(date_debut)s")
+            params['date_debut'] = date_debut
+        if date_fin is not None:
+            conditions.append("start_time < %(date_fin)s")
+            params['date_fin'] = date_fin
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        query = f"SELECT {', '.join(FEATURE_COLUMNS)} FROM session_features {where}"
+        return pd.read_sql(query, self.conn, params=params)
+
+    def get_features(self, session_ids: list) -> pd.DataFrame:
+        """
+        Features d'une liste de sessions (scoring) - lecture par clé primaire
+
+        Returns:
+            DataFrame avec les colonnes FEATURE_COLUMNS
+        """
+        query = (f"SELECT {', '.join(FEATURE_COLUMNS)} FROM session_features "
+                 f"WHERE session_id = ANY(%(ids)s)")
+        return pd.read_sql(query, self.conn, params={'ids': list(session_ids)})
+
+
+def main():
+    """Point d'entrée principal : rattachement puis mise à jour des features"""
+    conn = psycopg2.connect(
+        dbname="TP3_DB",
+        user="postgres",
+        password="0000",
+        host="localhost",
+        port="5432"
+    )
+    try:
+        store = FeatureStore(conn)
+        store.lier_evenements()
+        store.refresh()
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+-- Exercice 2 : Feature store par session
+-- ============================================
+-- Les événements portent désormais leur session_id (renseigné à l'insertion
+-- par generate_data.py / l'ETL). Les features ML sont pré-calculées par
+-- session dans session_features et maintenues par feature_store.py, au lieu
+-- de la jointure sessions ⋈ events sur user_id (toutes les sessions d'un
+-- utilisateur × tous ses événements).
+-- ============================================
+
+-- Rattachement des événements à leur session
+-- (après une migration vers events partitionnée, l'index est recréé par
+-- partition_manager.py sous le nom idx_events_part_session)
+ALTER TABLE events ADD COLUMN IF NOT EXISTS session_id VARCHAR(50);
+CREATE INDEX IF NOT EXISTS idx_events_session ON events(session_id);
+
+-- Features par session (mêmes colonnes que la requête du notebook)
+CREATE TABLE IF NOT EXISTS session_features (
+    session_id VARCHAR(50) PRIMARY KEY,
+    start_time TIMESTAMP NOT NULL,
+    time_on_site REAL,
+    pages_viewed INT,
+    source VARCHAR(50),
+    device VARCHAR(50),
+    hour_of_day SMALLINT,
+    day_of_week SMALLINT,
+    total_events INT DEFAULT 0,
+    add_to_cart_count INT DEFAULT 0,
+    page_view_count INT DEFAULT 0,
+    converted SMALLINT,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS idx_session_features_start ON session_features(start_time);
+
+-- Filigrane des événements (voir event_watermark.py) / dernier passage
+-- intégrés dans session_features
+CREATE TABLE IF NOT EXISTS feature_store_state (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    last_event_id BIGINT NOT NULL DEFAULT 0,
+    pending_event_id BIGINT,
+    pending_xmax BIGINT,
+    last_refresh TIMESTAMP
+);
+ALTER TABLE feature_store_state ADD COLUMN IF NOT EXISTS pending_event_id BIGINT;
+ALTER TABLE feature_store_state ADD COLUMN IF NOT EXISTS pending_xmax BIGINT;
+INSERT INTO feature_store_state (id) VALUES (TRUE) ON CONFLICT DO NOTHING;
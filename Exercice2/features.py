@@ -0,0 +1,125 @@
+"""
+Feature engineering du modèle de conversion
+Exercice 2 - Fonctions partagées entre le notebook et les scripts de scoring
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+CATEGORICAL_FEATURES = ['source', 'device']
+
+
+def compute_feature_stats(df: pd.DataFrame) -> dict:
+    """
+    Calcule les seuils utilisés par engineer_features sur le jeu d'entraînement
+
+    Ces statistiques sont figées dans l'artifact du modèle : au scoring,
+    une session (ou un lot) est comparée aux seuils d'entraînement et non
+    à ses propres médiane / quantiles.
+
+    Returns:
+        Dictionnaire de floats (sérialisable en JSON)
+    """
+    engagement_score = (
+        df['time_on_site'] * 0.3 +
+        df['pages_viewed'] * 0.3 +
+        df['add_to_cart_count'] * 2.0 +
+        df['total_events'] * 0.2
+    )
+    return {
+        'engagement_score_median': float(engagement_score.median()),
+        'pages_viewed_q75': float(df['pages_viewed'].quantile(0.75)),
+        'time_on_site_q75': float(df['time_on_site'].quantile(0.75)),
+    }
+
+
+def engineer_features(df: pd.DataFrame, inplace: bool = False, stats: dict = None) -> pd.DataFrame:
+    """
+    Crée des features dérivées à partir des features existantes
+
+    Les features continues sont en float32 et les indicateurs en int8,
+    pour garder le DataFrame compact sur de gros volumes.
+
+    Args:
+        df: Features par session (voir feature_store.FEATURE_COLUMNS)
+        inplace: Ajouter les colonnes directement dans df, sans copie
+        stats: Seuils figés (compute_feature_stats) ; calculés sur df si absent
+
+    Returns:
+        DataFrame enrichi
+    """
+    if not inplace:
+        df = df.copy()
+    if stats is None:
+        stats = compute_feature_stats(df)
+
+    # Appelée sur chaque lot au scoring : pas de sortie au niveau INFO
+    logger.debug(" Feature Engineering en cours...")
+
+    time_on_site = df['time_on_site'].astype(np.float32)
+    pages_viewed = df['pages_viewed'].astype(np.float32)
+    total_events = df['total_events'].astype(np.float32)
+    add_to_cart = df['add_to_cart_count'].astype(np.float32)
+
+    # 1. Métriques d'engagement
+    df['time_per_page'] = time_on_site / (pages_viewed + 1)
+    df['events_per_minute'] = total_events / (time_on_site + 1)
+
+    # 2. Score d'engagement composite
+    df['engagement_score'] = (
+        time_on_site * 0.3 +
+        pages_viewed * 0.3 +
+        add_to_cart * 2.0 +
+        total_events * 0.2
+    ).astype(np.float32)
+
+    # 3. Features temporelles
+    df['is_weekend'] = (df['day_of_week'] >= 5).astype(np.int8)
+    df['is_business_hours'] = ((df['hour_of_day'] >= 9) & (df['hour_of_day'] <= 17)).astype(np.int8)
+    df['is_evening'] = ((df['hour_of_day'] >= 18) & (df['hour_of_day'] <= 23)).astype(np.int8)
+
+    # 4. Features d'interaction
+    df['high_engagement_paid'] = ((df['source'] == 'paid') & (df['engagement_score'] > stats['engagement_score_median'])).astype(np.int8)
+    df['mobile_quick_session'] = ((df['device'] == 'mobile') & (time_on_site < 2)).astype(np.int8)
+
+    # 5. Indicateurs comportementaux
+    df['has_added_to_cart'] = (add_to_cart > 0).astype(np.int8)
+    df['high_page_views'] = (pages_viewed > stats['pages_viewed_q75']).astype(np.int8)
+    df['long_session'] = (time_on_site > stats['time_on_site_q75']).astype(np.int8)
+
+    logger.debug(f" Features créées: {df.shape[1]} features au total")
+
+    return df
+
+
+def encode_features(df: pd.DataFrame, feature_names: list) -> np.ndarray:
+    """
+    Encode les features dans l'ordre exact des colonnes d'entraînement
+
+    Équivalent de pd.get_dummies(..., drop_first=True) suivi de l'alignement
+    sur X_train.columns, mais indépendant des catégories présentes dans le
+    lot : 'source_paid' vaut (source == 'paid'), les colonnes inconnues
+    valent 0.
+
+    Args:
+        df: Sortie de engineer_features
+        feature_names: Colonnes d'entraînement (artifact['feature_names'])
+
+    Returns:
+        Matrice float32 (n_sessions, len(feature_names))
+    """
+    X = np.zeros((len(df), len(feature_names)), dtype=np.float32)
+    for j, nom in enumerate(feature_names):
+        if nom in df.columns:
+            X[:, j] = df[nom].to_numpy(dtype=np.float32)
+            continue
+        for cat in CATEGORICAL_FEATURES:
+            if nom.startswith(cat + '_'):
+                X[:, j] = (df[cat] == nom[len(cat) + 1:]).to_numpy(dtype=np.float32)
+                break
+    return X
@@ -4,6 +4,9 @@ from faker import Faker
 from datetime import datetime, timedelta
 import numpy as np
 
+from cohort_retention import CohortStore
+from feature_store import FeatureStore
+
 fake = Faker()
 
 N_SESSIONS = 10000
@@ -60,28 +63,34 @@ for i in range(N_SESSIONS):
 
     # EVENTS
     cur.execute("""
-        INSERT INTO events (user_id, event_type, channel, timestamp)
-        VALUES (%s, 'page_view', %s, %s)
-    """, (user_id, channel, start_time))
+        INSERT INTO events (user_id, session_id, event_type, channel, timestamp)
+        VALUES (%s, %s, 'page_view', %s, %s)
+    """, (user_id, session_id, channel, start_time))
 
     if pages_viewed > 2:
         cur.execute("""
-            INSERT INTO events (user_id, event_type, channel, timestamp)
-            VALUES (%s, 'add_to_cart', %s, %s)
-        """, (user_id, channel, start_time + timedelta(minutes=5)))
+            INSERT INTO events (user_id, session_id, event_type, channel, timestamp)
+            VALUES (%s, %s, 'add_to_cart', %s, %s)
+        """, (user_id, session_id, channel, start_time + timedelta(minutes=5)))
 
     if converted:
         cur.execute("""
             INSERT INTO events (
-                user_id, event_type, channel, revenue, timestamp
-            ) VALUES (%s, 'purchase', %s, %s, %s)
+                user_id, session_id, event_type, channel, revenue, timestamp
+            ) VALUES (%s, %s, 'purchase', %s, %s, %s)
         """, (
-            user_id, channel, revenue,
+            user_id, session_id, channel, revenue,
             start_time + timedelta(minutes=duration)
         ))
 
 conn.commit()
 cur.close()
+
+# Mise à jour incrémentale des features par session et des cohortes
+# (feature_store.sql, cohorts.sql)
+FeatureStore(conn).refresh()
+CohortStore(conn).refresh()
+
 conn.close()
 
 print(" 10 000 sessions et events générés avec succès")
@@ -0,0 +1,279 @@
+"""
+Registre local des modèles de conversion
+Exercice 2 - Artifacts compacts et versionnés (remplace conversion_model_<date>.pkl)
+
+Un artifact est un dossier contenant :
+- model.ubj      : le booster XGBoost au format natif UBJSON
+- manifest.json  : schéma des features, seuils figés, métriques, empreinte SHA-256
+
+Le format ne dépend que de json et xgboost (pas de pickle : un artifact reste
+lisible quelles que soient les versions de pandas / sklearn). Le registre
+versionne les artifacts, vérifie leur empreinte et garde le modèle actif
+chargé en mémoire, remplacé atomiquement à l'activation d'une nouvelle version.
+
+Coût de démarrage mesuré (xgboost 3.2) : charger et vérifier un artifact prend
+~10 ms, mais `import xgboost` prend 1,2 à 2 s, car xgboost.compat importe
+lui-même pandas, sklearn et scipy s'ils sont installés. Ce coût est payé une
+fois par processus : les services restent démarrés (OnlineScorer.serve, workers
+de batch_scoring) et les nouvelles versions sont rechargées à chaud, en
+quelques ms. xgboost n'est importé qu'au chargement ou à l'écriture d'un
+artifact : lister ou activer des versions reste instantané.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+MODEL_FILE = 'model.ubj'
+MANIFEST_FILE = 'manifest.json'
+ACTIVE_FILE = 'ACTIVE'
+TMP_PREFIX = '.tmp_'
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloc in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloc)
+    return h.hexdigest()
+
+
+def _ecrire_atomique(path: str, contenu: str):
+    """Écrire un fichier via un fichier temporaire + os.replace (jamais à moitié écrit)"""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=TMP_PREFIX)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(contenu)
+    os.replace(tmp, path)
+
+
+def save_artifact(directory: str, model, feature_names: list, categorical_features: list,
+                  feature_stats: dict, performance_metrics: dict = None, **extra) -> dict:
+    """
+    Écrire un artifact (model.ubj + manifest.json) dans directory
+
+    Args:
+        model: XGBClassifier entraîné ou xgboost.Booster
+        feature_names: Colonnes d'entraînement, dans l'ordre (X_train.columns)
+        categorical_features: Variables encodées en one-hot
+        feature_stats: Seuils figés (features.compute_feature_stats)
+        performance_metrics: Métriques d'évaluation (optionnel)
+        extra: Champs supplémentaires du manifest
+
+    Returns:
+        Le manifest écrit
+    """
+    import xgboost as xgb
+
+    os.makedirs(directory, exist_ok=True)
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    model_path = os.path.join(directory, MODEL_FILE)
+    booster.save_model(model_path)
+
+    manifest = {
+        'format': 'xgboost-ubj',
+        'model_file': MODEL_FILE,
+        'sha256': _sha256(model_path),
+        'xgboost_version': xgb.__version__,
+        'training_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'feature_names': list(feature_names),
+        'categorical_features': list(categorical_features),
+        'feature_stats': {k: float(v) for k, v in feature_stats.items()},
+        'performance_metrics': {k: float(v) for k, v in (performance_metrics or {}).items()},
+        **extra,
+    }
+    _ecrire_atomique(os.path.join(directory, MANIFEST_FILE),
+                     json.dumps(manifest, indent=2, ensure_ascii=False))
+    return manifest
+
+
+def load_artifact(directory: str, verify: bool = True) -> dict:
+    """
+    Charger un artifact
+
+    Returns:
+        Dictionnaire au format des artifacts du notebook : 'model' (Booster),
+        'feature_names', 'categorical_features', 'feature_stats', ... et 'manifest'
+
+    Raises:
+        ValueError: Empreinte SHA-256 différente de celle du manifest
+    """
+    import xgboost as xgb
+
+    with open(os.path.join(directory, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    model_path = os.path.join(directory, manifest['model_file'])
+    if verify and _sha256(model_path) != manifest['sha256']:
+        raise ValueError(f"Empreinte invalide pour {model_path} : artifact corrompu ou modifié")
+
+    booster = xgb.Booster(model_file=model_path)
+    return {
+        'model': booster,
+        'feature_names': manifest['feature_names'],
+        'categorical_features': manifest['categorical_features'],
+        'feature_stats': manifest['feature_stats'],
+        'performance_metrics': manifest.get('performance_metrics', {}),
+        'version': manifest.get('version'),
+        'manifest': manifest,
+    }
+
+
+class ModelRegistry:
+
+    def __init__(self, root: str, name: str = 'conversion', factory=None):
+        """
+        Args:
+            root: Dossier racine du registre
+            name: Nom du modèle (sous-dossier de root)
+            factory: Fonction appliquée à l'artifact chargé pour obtenir l'objet
+                     gardé en mémoire (ex: OnlineScorer) ; défaut: l'artifact
+        """
+        self.path = os.path.join(root, name)
+        self.name = name
+        self.factory = factory or (lambda artifacts: artifacts)
+        os.makedirs(self.path, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._active = None
+        self._active_version = None
+        self._watcher = None
+
+    # ============================================
+    # VERSIONS
+    # ============================================
+
+    def versions(self) -> list:
+        """Versions enregistrées (ordre chronologique), sans les écritures en cours"""
+        return sorted(
+            v for v in os.listdir(self.path)
+            if not v.startswith(TMP_PREFIX)
+            and os.path.isfile(os.path.join(self.path, v, MANIFEST_FILE))
+        )
+
+    def register(self, model, feature_names: list, categorical_features: list,
+                 feature_stats: dict, performance_metrics: dict = None,
+                 activate: bool = False) -> str:
+        """
+        Enregistrer une nouvelle version
+
+        L'artifact est écrit dans un dossier temporaire puis renommé : une
+        version visible dans le registre est toujours complète.
+
+        Returns:
+            Identifiant de la version (ex: v20251215_143000, suffixé _01, _02...
+            si une version a déjà été enregistrée dans la même seconde)
+        """
+        base = datetime.now().strftime('v%Y%m%d_%H%M%S')
+        suffixe = 0
+        while True:
+            version = f"{base}_{suffixe:02d}" if suffixe else base
+            suffixe += 1
+            if os.path.exists(os.path.join(self.path, version)):
+                continue
+            tmp = tempfile.mkdtemp(dir=self.path, prefix=TMP_PREFIX)
+            try:
+                save_artifact(tmp, model, feature_names, categorical_features,
+                              feature_stats, performance_metrics,
+                              name=self.name, version=version)
+                os.rename(tmp, os.path.join(self.path, version))
+                break
+            except OSError:
+                shutil.rmtree(tmp, ignore_errors=True)
+                # Nom pris entre-temps par un autre enregistrement : suffixe suivant
+                if os.path.exists(os.path.join(self.path, version)):
+                    continue
+                raise
+            except Exception:
+                shutil.rmtree(tmp, ignore_errors=True)
+                raise
+        logger.info(f" ✓ Modèle {self.name} enregistré: {version}")
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version: str):
+        """Désigner la version active (écriture atomique du fichier ACTIVE)"""
+        if version not in self.versions():
+            raise ValueError(f"Version inconnue: {version}")
+        _ecrire_atomique(os.path.join(self.path, ACTIVE_FILE), version)
+        logger.info(f" ✓ Version active: {version}")
+        self.refresh()
+
+    def active_version(self) -> str:
+        """Version désignée par le fichier ACTIVE (None si aucune)"""
+        try:
+            with open(os.path.join(self.path, ACTIVE_FILE), 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def load(self, version: str) -> dict:
+        """Charger (et vérifier) une version donnée"""
+        return load_artifact(os.path.join(self.path, version))
+
+    # ============================================
+    # MODÈLE ACTIF EN MÉMOIRE
+    # ============================================
+
+    def refresh(self) -> bool:
+        """
+        Recharger le modèle actif si la version désignée a changé
+
+        Le nouveau modèle est chargé et préparé (factory) à côté de l'ancien ;
+        la référence n'est remplacée qu'une fois prêt. Les appels en cours
+        terminent avec l'ancien modèle.
+
+        Returns:
+            True si le modèle actif a été remplacé
+        """
+        version = self.active_version()
+        if version is None or version == self._active_version:
+            return False
+        pret = self.factory(self.load(version))
+        with self._lock:
+            self._active, self._active_version = pret, version
+        logger.info(f" ✓ Modèle actif rechargé: {version}")
+        return True
+
+    def get_active(self):
+        """Objet actif en mémoire (chargé au premier appel)"""
+        if self._active is None:
+            self.refresh()
+            if self._active is None:
+                raise LookupError(f"Aucune version active pour le modèle {self.name}")
+        return self._active
+
+    def watch(self, interval: float = 5.0):
+        """Surveiller le fichier ACTIVE en tâche de fond et recharger à chaud"""
+        if self._watcher is not None:
+            return
+        arret = threading.Event()
+
+        def boucle():
+            while not arret.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    # Le modèle courant reste en service
+                    logger.error(f" ✗ Rechargement impossible: {e}")
+
+        self._watcher = (threading.Thread(target=boucle, daemon=True), arret)
+        self._watcher[0].start()
+
+    def stop_watch(self):
+        if self._watcher is not None:
+            self._watcher[1].set()
+            self._watcher = None
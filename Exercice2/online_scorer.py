@@ -0,0 +1,279 @@
+"""
+Scoring temps réel d'une session (ou d'un micro-lot) avec le modèle de conversion
+Exercice 2 - Personnalisation en ligne
+
+Ce script :
+1. Charge le modèle et les seuils figés à l'entraînement (feature_stats),
+   depuis le registre (model_registry.py) ou un artifact joblib
+2. Construit le vecteur de features directement dans un tableau NumPy pré-alloué
+   (pas de pandas, pas de get_dummies sur le chemin critique)
+3. Expose une API Python (OnlineScorer.score) et un petit endpoint HTTP local
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from model_registry import ModelRegistry
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _derived_features(s: dict, stats: dict) -> dict:
+    """
+    Mêmes formules que features.engineer_features, pour une seule session
+
+    Args:
+        s: Session brute (colonnes de feature_store.FEATURE_COLUMNS)
+        stats: Seuils figés (features.compute_feature_stats)
+    """
+    # Calculs en float32, comme engineer_features : les valeurs proches d'un
+    # seuil de split doivent tomber du même côté qu'à l'entraînement
+    time_on_site = np.float32(s['time_on_site'])
+    pages_viewed = np.float32(s['pages_viewed'])
+    total_events = np.float32(s['total_events'])
+    add_to_cart = np.float32(s['add_to_cart_count'])
+    hour = int(s['hour_of_day'])
+    engagement_score = time_on_site * 0.3 + pages_viewed * 0.3 + add_to_cart * 2.0 + total_events * 0.2
+
+    return {
+        'time_on_site': time_on_site,
+        'pages_viewed': pages_viewed,
+        'hour_of_day': hour,
+        'day_of_week': int(s['day_of_week']),
+        'total_events': total_events,
+        'add_to_cart_count': add_to_cart,
+        'page_view_count': np.float32(s['page_view_count']),
+        'time_per_page': time_on_site / (pages_viewed + 1),
+        'events_per_minute': total_events / (time_on_site + 1),
+        'engagement_score': engagement_score,
+        'is_weekend': int(s['day_of_week']) >= 5,
+        'is_business_hours': 9 <= hour <= 17,
+        'is_evening': 18 <= hour <= 23,
+        'high_engagement_paid': s['source'] == 'paid' and engagement_score > stats['engagement_score_median'],
+        'mobile_quick_session': s['device'] == 'mobile' and time_on_site < 2,
+        'has_added_to_cart': add_to_cart > 0,
+        'high_page_views': pages_viewed > stats['pages_viewed_q75'],
+        'long_session': time_on_site > stats['time_on_site_q75'],
+    }
+
+
+class OnlineScorer:
+
+    def __init__(self, artifacts: dict, max_batch: int = 64):
+        """
+        Args:
+            artifacts: Artifact du modèle (dict avec 'model', 'feature_names',
+                       'categorical_features' et 'feature_stats')
+            max_batch: Taille maximale d'un micro-lot
+        """
+        if 'feature_stats' not in artifacts:
+            raise ValueError("L'artifact ne contient pas 'feature_stats' : ré-entraîner le modèle "
+                             "avec le notebook à jour pour figer les seuils")
+
+        self.feature_names = list(artifacts['feature_names'])
+        self.stats = dict(artifacts['feature_stats'])
+        self.max_batch = max_batch
+
+        model = artifacts['model']
+        self.booster = model.get_booster() if hasattr(model, 'get_booster') else model
+        # Petits lots : un seul thread évite le coût de synchronisation d'OpenMP
+        self.booster.set_param({'nthread': 1})
+
+        # Disposition des colonnes calculée une fois : index des features
+        # numériques et table (catégorie, valeur) -> index pour le one-hot
+        self._numeriques = []
+        categorical_features = artifacts.get('categorical_features', ['source', 'device'])
+        self._one_hot = {cat: {} for cat in categorical_features}
+        for j, nom in enumerate(self.feature_names):
+            for cat in categorical_features:
+                if nom.startswith(cat + '_'):
+                    self._one_hot[cat][nom[len(cat) + 1:]] = j
+                    break
+            else:
+                self._numeriques.append((j, nom))
+
+        # Un tampon pré-alloué par thread (serveur HTTP multi-thread)
+        self._local = threading.local()
+        self.version = artifacts.get('version')
+
+        # Première prédiction à vide : initialisation du booster hors chemin critique
+        self.booster.inplace_predict(self._buffer()[:1])
+
+    @classmethod
+    def from_file(cls, model_path: str, **kwargs) -> 'OnlineScorer':
+        """Charger depuis un artifact joblib produit par le notebook (ancien format)"""
+        import joblib
+        return cls(joblib.load(model_path), **kwargs)
+
+    @classmethod
+    def from_registry(cls, root: str, name: str = 'conversion', watch: bool = True) -> ModelRegistry:
+        """
+        Registre dont le modèle actif est un OnlineScorer prêt à servir
+
+        Utiliser registry.get_active().score(...) : la nouvelle version est
+        rechargée à chaud dès qu'elle est activée (watch=True).
+        """
+        registry = ModelRegistry(root, name, factory=cls)
+        registry.get_active()
+        if watch:
+            registry.watch()
+        return registry
+
+    def _buffer(self) -> np.ndarray:
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = np.zeros((self.max_batch, len(self.feature_names)), dtype=np.float32)
+            self._local.buffer = buffer
+        return buffer
+
+    def build_features(self, sessions: list) -> np.ndarray:
+        """
+        Remplir le tampon pré-alloué avec les features des sessions
+
+        Returns:
+            Vue (n_sessions, n_features) sur le tampon du thread courant
+        """
+        n = len(sessions)
+        if n > self.max_batch:
+            raise ValueError(f"Micro-lot de {n} sessions > max_batch={self.max_batch}")
+
+        X = self._buffer()[:n]
+        X.fill(0)
+        for i, s in enumerate(sessions):
+            valeurs = _derived_features(s, self.stats)
+            ligne = X[i]
+            for j, nom in self._numeriques:
+                ligne[j] = valeurs.get(nom, 0)
+            for cat, index in self._one_hot.items():
+                j = index.get(s.get(cat))
+                if j is not None:
+                    ligne[j] = 1
+        return X
+
+    def score(self, sessions: list) -> np.ndarray:
+        """
+        Probabilités de conversion d'un micro-lot de sessions
+
+        Args:
+            sessions: Liste de dictionnaires (colonnes de feature_store.FEATURE_COLUMNS)
+
+        Returns:
+            Tableau float32 des probabilités
+        """
+        X = self.build_features(sessions)
+        # inplace_predict peut renvoyer une vue sur un tampon interne réutilisé
+        # par l'appel suivant : copie (quelques octets)
+        return np.array(self.booster.inplace_predict(X), dtype=np.float32)
+
+    def score_one(self, session: dict) -> float:
+        """Probabilité de conversion d'une seule session"""
+        return float(self.score([session])[0])
+
+
+def make_handler(get_scorer):
+    """
+    Handler HTTP : POST /score avec {"session": {...}} ou {"sessions": [...]}
+
+    Args:
+        get_scorer: Fonction renvoyant le scorer courant (relue à chaque requête
+                    pour suivre le rechargement à chaud)
+    """
+
+    class ScoringHandler(BaseHTTPRequestHandler):
+
+        def do_POST(self):
+            if self.path != '/score':
+                self.send_error(404)
+                return
+            try:
+                longueur = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(longueur))
+                sessions = payload['sessions'] if 'sessions' in payload else [payload['session']]
+                scorer = get_scorer()
+                probas = scorer.score(sessions)
+                reponse = {'probabilities': [float(p) for p in probas], 'version': scorer.version}
+                code = 200
+            except (KeyError, TypeError, ValueError) as e:
+                reponse = {'error': str(e)}
+                code = 400
+
+            body = json.dumps(reponse).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Pas de log par requête sur le chemin critique
+            pass
+
+    return ScoringHandler
+
+
+def serve(scorer, host: str = '127.0.0.1', port: int = 8081):
+    """
+    Démarrer l'endpoint HTTP local
+
+    Args:
+        scorer: OnlineScorer, ou ModelRegistry construit par OnlineScorer.from_registry
+    """
+    get_scorer = scorer.get_active if isinstance(scorer, ModelRegistry) else (lambda: scorer)
+    server = ThreadingHTTPServer((host, port), make_handler(get_scorer))
+    logger.info(f" Scoring en ligne sur http://{host}:{port}/score")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def benchmark(scorer: OnlineScorer, session: dict, n: int = 10000):
+    """Mesurer la latence de score_one (p50 / p99, en microsecondes)"""
+    durees = np.empty(n)
+    for i in range(n):
+        debut = time.perf_counter()
+        scorer.score_one(session)
+        durees[i] = time.perf_counter() - debut
+    print(f" p50: {np.percentile(durees, 50) * 1e6:.0f} µs")
+    print(f" p99: {np.percentile(durees, 99) * 1e6:.0f} µs")
+
+
+def main():
+    """Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="Scoring en ligne des sessions")
+    parser.add_argument('--registry', default='model_registry',
+                        help="Dossier du registre (modèle actif rechargé à chaud)")
+    parser.add_argument('--model-path', help="Artifact joblib (ancien format) au lieu du registre")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--benchmark', action='store_true')
+    args = parser.parse_args()
+
+    if args.model_path:
+        scorer = OnlineScorer.from_file(args.model_path)
+    else:
+        scorer = OnlineScorer.from_registry(args.registry)
+
+    if args.benchmark:
+        actif = scorer.get_active() if isinstance(scorer, ModelRegistry) else scorer
+        benchmark(actif, {
+            'time_on_site': 10.5, 'pages_viewed': 8, 'source': 'paid', 'device': 'desktop',
+            'hour_of_day': 14, 'day_of_week': 2, 'total_events': 15,
+            'add_to_cart_count': 3, 'page_view_count': 8,
+        })
+        return
+    serve(scorer, args.host, args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,521 @@
+"""
+Gestion des partitions mensuelles des tables events et sessions
+Exercice 2 - Schéma partitionné (voir partitioning.sql)
+
+Ce script :
+1. Crée à l'avance les partitions des mois à venir
+2. Migre les anciennes tables (non partitionnées) par lots, sans bloquer les écritures
+3. Bascule atomiquement vers la table partitionnée une fois la copie terminée
+4. Applique la rétention en détachant / supprimant les partitions trop anciennes
+"""
+
+import argparse
+import logging
+import time
+from datetime import date, datetime
+
+import psycopg2
+from psycopg2 import sql
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# Description des tables partitionnées :
+# - time_column : clé de partitionnement (RANGE mensuel)
+# - key         : clé de parcours pour la migration par lots (keyset)
+# - brin_index  : nom de l'index BRIN créé sur time_column
+# - indexes     : index B-tree supplémentaires {nom: colonne}, créés si la
+#                 colonne existe. Les noms d'index sont uniques dans le schéma :
+#                 ils diffèrent de ceux de l'ancienne table (conservée en _legacy)
+TABLES = {
+    'events': {
+        'time_column': 'timestamp',
+        'key': 'event_id',
+        'brin_index': 'idx_events_timestamp_brin',
+        'indexes': {'idx_events_part_session': 'session_id'},
+    },
+    'sessions': {
+        'time_column': 'start_time',
+        'key': 'session_id',
+        'brin_index': 'idx_sessions_start_brin',
+        'indexes': {},
+    },
+}
+
+
+def debut_mois(d: date) -> date:
+    """Premier jour du mois de d"""
+    return date(d.year, d.month, 1)
+
+
+def ajouter_mois(d: date, n: int) -> date:
+    """Premier jour du mois situé n mois après celui de d"""
+    mois = d.year * 12 + (d.month - 1) + n
+    return date(mois // 12, mois % 12 + 1, 1)
+
+
+def nom_partition(table: str, mois: date) -> str:
+    """Nom de la partition mensuelle, ex: events_p2025_01"""
+    return f"{table}_p{mois.year:04d}_{mois.month:02d}"
+
+
+class PartitionManager:
+
+    def __init__(self, db_config: dict = None):
+        """
+        Initialiser le gestionnaire de partitions
+
+        Args:
+            db_config: Paramètres de connexion PostgreSQL
+        """
+        self.db_config = db_config or {
+            'host': 'localhost',
+            'database': 'TP3_DB',
+            'user': 'postgres',
+            'password': '0000',
+            'port': '5432'
+        }
+        self.conn = None
+
+    def connect_db(self):
+        """Connexion à PostgreSQL"""
+        try:
+            self.conn = psycopg2.connect(**self.db_config)
+            logger.info(" Connecté à PostgreSQL")
+        except Exception as e:
+            logger.error(f" Erreur de connexion DB: {e}")
+            raise
+
+    def close_db(self):
+        """Fermer la connexion"""
+        if self.conn:
+            self.conn.close()
+            logger.info(" Connexion fermée")
+
+    # ============================================
+    # CRÉATION DES PARTITIONS
+    # ============================================
+
+    def creer_partition(self, table: str, mois: date, parent: str = None):
+        """
+        Créer la partition d'un mois si elle n'existe pas encore
+
+        Args:
+            table: Table partitionnée (donne le nom de la partition)
+            mois: Premier jour du mois à couvrir
+            parent: Table parente effective si différente de table
+                    (ex: events_partitioned pendant une migration)
+        """
+        debut = debut_mois(mois)
+        fin = ajouter_mois(debut, 1)
+        query = sql.SQL(
+            "CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {table} "
+            "FOR VALUES FROM (%s) TO (%s)"
+        ).format(
+            partition=sql.Identifier(nom_partition(table, debut)),
+            table=sql.Identifier(parent or table)
+        )
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(query, (debut, fin))
+            self.conn.commit()
+        except psycopg2.Error as e:
+            # Typiquement : la partition par défaut contient déjà des lignes du mois
+            self.conn.rollback()
+            logger.error(f"   ✗ Partition {nom_partition(table, debut)}: {e}")
+            raise
+
+    def creer_partitions(self, table: str, debut: date, fin: date, parent: str = None):
+        """Créer toutes les partitions mensuelles entre debut et fin (inclus)"""
+        mois = debut_mois(debut)
+        nb = 0
+        while mois <= debut_mois(fin):
+            self.creer_partition(table, mois, parent)
+            mois = ajouter_mois(mois, 1)
+            nb += 1
+        logger.info(f"   ✓ {table}: {nb} partitions de {debut_mois(debut)} à {debut_mois(fin)}")
+
+    def creer_partitions_futures(self, table: str, mois_avance: int = 3):
+        """
+        Créer les partitions du mois courant et des mois à venir
+
+        À lancer régulièrement (cron) pour que les insertions ne tombent
+        jamais dans la partition par défaut.
+        """
+        aujourd_hui = date.today()
+        self.creer_partitions(table, aujourd_hui, ajouter_mois(aujourd_hui, mois_avance))
+
+    def verifier_partition_defaut(self, table: str) -> int:
+        """Compter les lignes tombées dans la partition par défaut (doit rester 0)"""
+        query = sql.SQL("SELECT COUNT(*) FROM {}").format(sql.Identifier(f"{table}_default"))
+        with self.conn.cursor() as cur:
+            cur.execute(query)
+            nb = cur.fetchone()[0]
+        self.conn.commit()
+        if nb:
+            logger.warning(f"  {nb} lignes dans {table}_default - créer les partitions manquantes")
+        return nb
+
+    # ============================================
+    # RÉTENTION
+    # ============================================
+
+    def lister_partitions(self, table: str) -> list:
+        """Lister les partitions mensuelles d'une table : [(mois, nom), ...] triées"""
+        query = """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = %s
+        """
+        with self.conn.cursor() as cur:
+            cur.execute(query, (table,))
+            noms = [row[0] for row in cur.fetchall()]
+        self.conn.commit()
+
+        partitions = []
+        prefixe = f"{table}_p"
+        for nom in noms:
+            if not nom.startswith(prefixe):
+                continue  # partition par défaut
+            try:
+                mois = datetime.strptime(nom[len(prefixe):], '%Y_%m').date()
+            except ValueError:
+                continue
+            partitions.append((mois, nom))
+        return sorted(partitions)
+
+    def supprimer_partitions(self, table: str, retention_mois: int) -> list:
+        """
+        Supprimer les partitions plus anciennes que la période de rétention
+
+        Un DROP de partition est quasi instantané, contrairement à un
+        DELETE ... WHERE timestamp < ... suivi d'un VACUUM.
+
+        Returns:
+            Liste des partitions supprimées
+        """
+        limite = ajouter_mois(debut_mois(date.today()), -retention_mois)
+        supprimees = []
+        for mois, nom in self.lister_partitions(table):
+            if mois >= limite:
+                continue
+            try:
+                with self.conn.cursor() as cur:
+                    cur.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+                        sql.Identifier(table), sql.Identifier(nom)))
+                    cur.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(nom)))
+                self.conn.commit()
+                supprimees.append(nom)
+            except psycopg2.Error as e:
+                self.conn.rollback()
+                logger.error(f"   ✗ Suppression de {nom}: {e}")
+                raise
+        logger.info(f"   ✓ {table}: {len(supprimees)} partitions supprimées (avant {limite})")
+        return supprimees
+
+    def maintenance(self, mois_avance: int = 3, retention_mois: int = None):
+        """Créer les partitions à venir et appliquer la rétention sur toutes les tables"""
+        for table in TABLES:
+            self.creer_partitions_futures(table, mois_avance)
+            self.verifier_partition_defaut(table)
+            if retention_mois is not None:
+                self.supprimer_partitions(table, retention_mois)
+
+    # ============================================
+    # MIGRATION DEPUIS LES TABLES NON PARTITIONNÉES
+    # ============================================
+
+    def _creer_table_suivi(self):
+        """Table de suivi de la migration (reprise possible après interruption)"""
+        query = """
+        CREATE TABLE IF NOT EXISTS partition_migration (
+            table_name VARCHAR(50) PRIMARY KEY,
+            last_key TEXT,
+            rows_copied BIGINT DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT NOW()
+        )
+        """
+        with self.conn.cursor() as cur:
+            cur.execute(query)
+        self.conn.commit()
+
+    def _lire_progression(self, table: str):
+        with self.conn.cursor() as cur:
+            cur.execute(
+                "SELECT last_key, rows_copied FROM partition_migration WHERE table_name = %s",
+                (table,)
+            )
+            row = cur.fetchone()
+        self.conn.commit()
+        return row if row else (None, 0)
+
+    def preparer_migration(self, table: str, mois_avance: int = 3):
+        """
+        Créer la table partitionnée <table>_partitioned à côté de l'ancienne
+
+        La structure (colonnes, valeurs par défaut, séquence) est reprise de
+        l'ancienne table, avec la clé primaire étendue à la colonne temporelle.
+        Peut être relancée : les objets existants sont conservés et la
+        progression de la copie repart de zéro.
+        """
+        cfg = TABLES[table]
+        cible = f"{table}_partitioned"
+        logger.info(f" MIGRATION - Préparation de {cible}")
+
+        self._creer_table_suivi()
+        with self.conn.cursor() as cur:
+            cur.execute(sql.SQL(
+                "CREATE TABLE IF NOT EXISTS {cible} (LIKE {source} INCLUDING DEFAULTS) "
+                "PARTITION BY RANGE ({temps})"
+            ).format(
+                cible=sql.Identifier(cible),
+                source=sql.Identifier(table),
+                temps=sql.Identifier(cfg['time_column'])
+            ))
+            cur.execute(sql.SQL("ALTER TABLE {} ALTER COLUMN {} SET NOT NULL").format(
+                sql.Identifier(cible), sql.Identifier(cfg['time_column'])))
+            cur.execute(
+                "SELECT 1 FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'",
+                (cible,)
+            )
+            if cur.fetchone() is None:
+                cur.execute(sql.SQL(
+                    "ALTER TABLE {cible} ADD CONSTRAINT {pk} PRIMARY KEY ({key}, {temps})"
+                ).format(
+                    cible=sql.Identifier(cible),
+                    pk=sql.Identifier(f"{table}_part_pkey"),
+                    key=sql.Identifier(cfg['key']),
+                    temps=sql.Identifier(cfg['time_column'])
+                ))
+            cur.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} DEFAULT").format(
+                sql.Identifier(f"{table}_default"), sql.Identifier(cible)))
+            cur.execute(sql.SQL(
+                "CREATE INDEX IF NOT EXISTS {} ON {} USING brin ({}) WITH (pages_per_range = 32)"
+            ).format(
+                sql.Identifier(cfg['brin_index']),
+                sql.Identifier(cible),
+                sql.Identifier(cfg['time_column'])
+            ))
+            cur.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} (user_id)").format(
+                sql.Identifier(f"idx_{table}_user_id"), sql.Identifier(cible)))
+            for index, colonne in cfg['indexes'].items():
+                # Ex: events.session_id (feature_store.sql), lu par FeatureStore.refresh
+                cur.execute(
+                    "SELECT 1 FROM information_schema.columns "
+                    "WHERE table_name = %s AND column_name = %s",
+                    (cible, colonne)
+                )
+                if cur.fetchone():
+                    cur.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} ({})").format(
+                        sql.Identifier(index), sql.Identifier(cible), sql.Identifier(colonne)))
+
+            # Bornes des données existantes pour créer les partitions nécessaires
+            cur.execute(sql.SQL("SELECT MIN({temps}), MAX({temps}) FROM {source}").format(
+                temps=sql.Identifier(cfg['time_column']), source=sql.Identifier(table)))
+            premier, dernier = cur.fetchone()
+            cur.execute(
+                "INSERT INTO partition_migration (table_name) VALUES (%s) "
+                "ON CONFLICT (table_name) DO UPDATE SET last_key = NULL, rows_copied = 0",
+                (table,)
+            )
+        self.conn.commit()
+
+        # Les partitions portent déjà leur nom définitif (events_p2025_01, ...) :
+        # après la bascule, maintenance() et la rétention les retrouvent
+        premier = (premier or datetime.now()).date()
+        dernier = max((dernier or datetime.now()).date(), ajouter_mois(date.today(), mois_avance))
+        self.creer_partitions(table, premier, dernier, parent=cible)
+
+    def _copier_lot(self, table: str, cible: str, last_key, taille_lot: int):
+        """
+        Copier un lot de lignes (parcours keyset sur la clé de la table)
+
+        Returns:
+            (dernière clé copiée, nombre de lignes du lot)
+        """
+        cfg = TABLES[table]
+        condition = sql.SQL("{temps} IS NOT NULL").format(temps=sql.Identifier(cfg['time_column']))
+        params = []
+        if last_key is not None:
+            condition = sql.SQL("{} AND {} > %s").format(condition, sql.Identifier(cfg['key']))
+            params.append(last_key)
+        params.append(taille_lot)
+
+        query = sql.SQL("""
+        WITH lot AS (
+            SELECT * FROM {source}
+            WHERE {condition}
+            ORDER BY {key}
+            LIMIT %s
+        ),
+        copie AS (
+            INSERT INTO {cible} SELECT * FROM lot
+            ON CONFLICT DO NOTHING
+        )
+        SELECT MAX({key})::text, COUNT(*) FROM lot
+        """).format(
+            source=sql.Identifier(table),
+            cible=sql.Identifier(cible),
+            condition=condition,
+            key=sql.Identifier(cfg['key'])
+        )
+        with self.conn.cursor() as cur:
+            cur.execute(query, params)
+            dernier, nb = cur.fetchone()
+            if nb:
+                cur.execute(
+                    "UPDATE partition_migration "
+                    "SET last_key = %s, rows_copied = rows_copied + %s, updated_at = NOW() "
+                    "WHERE table_name = %s",
+                    (dernier, nb, table)
+                )
+        # Un commit par lot : verrous courts, reprise possible à tout moment
+        self.conn.commit()
+        return (dernier if nb else last_key), nb
+
+    def migrer_table(self, table: str, taille_lot: int = 50000, pause: float = 0.0):
+        """
+        Copier l'ancienne table vers <table>_partitioned par lots
+
+        L'ancienne table reste utilisable en lecture comme en écriture
+        pendant toute la copie. La migration reprend là où elle s'était
+        arrêtée si elle est relancée.
+
+        Args:
+            table: 'events' ou 'sessions'
+            taille_lot: Nombre de lignes copiées par transaction
+            pause: Pause (secondes) entre deux lots pour limiter la charge
+        """
+        cible = f"{table}_partitioned"
+        last_key, total = self._lire_progression(table)
+        logger.info(f" MIGRATION - Copie de {table} vers {cible} (reprise après {last_key})")
+
+        while True:
+            last_key, nb = self._copier_lot(table, cible, last_key, taille_lot)
+            if nb == 0:
+                break
+            total += nb
+            logger.info(f"   → {total} lignes copiées (clé {last_key})")
+            if pause:
+                time.sleep(pause)
+
+        logger.info(f"   ✓ Copie de {table} terminée : {total} lignes")
+        return total
+
+    def finaliser_migration(self, table: str):
+        """
+        Basculer vers la table partitionnée
+
+        Dans une seule transaction : blocage des écritures (les lectures
+        continuent), copie des dernières lignes arrivées depuis la fin de
+        migrer_table, puis échange des noms. L'ancienne table est conservée
+        sous le nom <table>_legacy.
+
+        Le parcours keyset de migrer_table peut manquer des lignes : une clé
+        inférieure à last_key peut encore être insérée (session_id libre) ou
+        validée (event_id attribué à l'insertion, pas au commit) après le
+        passage du lot. Le rattrapage compare donc toute l'ancienne table à
+        la nouvelle (anti-jointure sur la clé primaire) : une première passe
+        sans verrou copie l'essentiel, la passe sous verrou ne copie plus que
+        les dernières lignes.
+
+        Les lignes sans valeur pour la colonne temporelle ne peuvent pas être
+        partitionnées : elles sont comptées et restent dans <table>_legacy.
+
+        Les lignes de sessions modifiées après avoir été copiées ne sont pas
+        resynchronisées : finaliser pendant une fenêtre sans mise à jour.
+        """
+        cfg = TABLES[table]
+        cible = f"{table}_partitioned"
+        logger.info(f" MIGRATION - Bascule de {table}")
+
+        rattrapage = sql.SQL("""
+        INSERT INTO {cible}
+        SELECT s.* FROM {source} s
+        WHERE s.{temps} IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM {cible} c WHERE c.{key} = s.{key} AND c.{temps} = s.{temps}
+          )
+        ON CONFLICT DO NOTHING
+        """).format(
+            cible=sql.Identifier(cible),
+            source=sql.Identifier(table),
+            temps=sql.Identifier(cfg['time_column']),
+            key=sql.Identifier(cfg['key'])
+        )
+
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(rattrapage)
+                self.conn.commit()
+                logger.info(f"   → {cur.rowcount} lignes rattrapées avant verrouillage")
+
+                cur.execute(sql.SQL("LOCK TABLE {} IN SHARE ROW EXCLUSIVE MODE").format(
+                    sql.Identifier(table)))
+                cur.execute(rattrapage)
+                logger.info(f"   → {cur.rowcount} lignes de rattrapage")
+
+                cur.execute(sql.SQL("SELECT COUNT(*) FROM {} WHERE {} IS NULL").format(
+                    sql.Identifier(table), sql.Identifier(cfg['time_column'])))
+                sans_date = cur.fetchone()[0]
+                if sans_date:
+                    logger.warning(f"  {sans_date} lignes sans {cfg['time_column']} non migrées "
+                                   f"(conservées dans {table}_legacy)")
+
+                cur.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(
+                    sql.Identifier(table), sql.Identifier(f"{table}_legacy")))
+                cur.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(
+                    sql.Identifier(cible), sql.Identifier(table)))
+
+                # La séquence (event_id) appartient encore à l'ancienne table :
+                # la rattacher à la nouvelle pour qu'un DROP de _legacy ne l'emporte pas
+                cur.execute("SELECT pg_get_serial_sequence(%s, %s)",
+                            (f"{table}_legacy", cfg['key']))
+                sequence = cur.fetchone()[0]
+                if sequence:
+                    cur.execute(sql.SQL("ALTER SEQUENCE {} OWNED BY {}.{}").format(
+                        sql.SQL(sequence), sql.Identifier(table), sql.Identifier(cfg['key'])))
+            self.conn.commit()
+            logger.info(f"   ✓ {table} est maintenant partitionnée ({table}_legacy conservée)")
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"   ✗ Erreur: {e}")
+            raise
+
+
+def main():
+    """Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="Gestion des partitions events / sessions")
+    parser.add_argument('action', choices=['maintenance', 'preparer', 'migrer', 'finaliser'])
+    parser.add_argument('--table', choices=list(TABLES), help="Table à migrer (défaut: toutes)")
+    parser.add_argument('--mois-avance', type=int, default=3)
+    parser.add_argument('--retention-mois', type=int, default=None)
+    parser.add_argument('--taille-lot', type=int, default=50000)
+    parser.add_argument('--pause', type=float, default=0.0)
+    args = parser.parse_args()
+
+    tables = [args.table] if args.table else list(TABLES)
+    manager = PartitionManager()
+    manager.connect_db()
+    try:
+        if args.action == 'maintenance':
+            manager.maintenance(args.mois_avance, args.retention_mois)
+        for table in tables:
+            if args.action == 'preparer':
+                manager.preparer_migration(table, args.mois_avance)
+            elif args.action == 'migrer':
+                manager.migrer_table(table, args.taille_lot, args.pause)
+            elif args.action == 'finaliser':
+                manager.finaliser_migration(table)
+    finally:
+        manager.close_db()
+
+
+if __name__ == '__main__':
+    main()
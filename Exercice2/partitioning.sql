@@ -0,0 +1,64 @@
+-- Exercice 2 : Schéma partitionné pour events / sessions
+-- ============================================
+-- Les tables events et sessions sont partitionnées par mois (RANGE sur la
+-- colonne temporelle). Chaque partition est une petite table : les requêtes
+-- bornées dans le temps ne lisent que les partitions concernées (partition
+-- pruning) et la rétention se fait par DROP d'une partition entière.
+--
+-- Les partitions mensuelles elles-mêmes sont créées par partition_manager.py
+-- (création à l'avance + migration des anciennes tables + rétention).
+-- ============================================
+
+-- Table des événements (partitionnée par mois sur timestamp)
+CREATE TABLE events (
+    event_id BIGSERIAL,
+    user_id VARCHAR(50),
+    event_type VARCHAR(50), -- 'page_view', 'add_to_cart', 'purchase'
+    timestamp TIMESTAMP NOT NULL DEFAULT NOW(),
+    channel VARCHAR(50), -- 'organic', 'paid', 'email', 'social'
+    revenue DECIMAL(10,2) DEFAULT 0,
+    properties JSONB, -- données additionnelles
+    -- La clé de partitionnement doit faire partie de la clé primaire
+    PRIMARY KEY (event_id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- Table des sessions (partitionnée par mois sur start_time)
+CREATE TABLE sessions (
+    session_id VARCHAR(50),
+    user_id VARCHAR(50),
+    start_time TIMESTAMP NOT NULL,
+    end_time TIMESTAMP,
+    pages_viewed INT DEFAULT 0,
+    converted BOOLEAN DEFAULT FALSE,
+    channel VARCHAR(50),
+    PRIMARY KEY (session_id, start_time)
+) PARTITION BY RANGE (start_time);
+
+-- Partitions par défaut : filet de sécurité pour les lignes hors de toute
+-- partition mensuelle. Elles doivent rester vides (partition_manager.py crée
+-- les mois à venir à l'avance et signale les lignes tombées ici).
+CREATE TABLE events_default PARTITION OF events DEFAULT;
+CREATE TABLE sessions_default PARTITION OF sessions DEFAULT;
+
+-- ============================================
+-- Index
+-- ============================================
+-- BRIN sur les colonnes temporelles : quelques pages par partition au lieu
+-- d'un B-tree de la taille de la table (les données arrivent dans l'ordre
+-- chronologique, donc les blocs sont naturellement triés).
+CREATE INDEX idx_events_timestamp_brin ON events USING brin (timestamp) WITH (pages_per_range = 32);
+CREATE INDEX idx_sessions_start_brin ON sessions USING brin (start_time) WITH (pages_per_range = 32);
+
+-- B-tree conservés pour les accès par utilisateur (déclarés sur la table
+-- parente, ils sont créés automatiquement sur chaque partition).
+-- L'ancien index sur event_type n'est pas recréé : 3 valeurs possibles,
+-- il n'était jamais sélectif.
+CREATE INDEX idx_events_user_id ON events(user_id);
+CREATE INDEX idx_sessions_user_id ON sessions(user_id);
+
+-- ============================================
+-- Vérification du partition pruning
+-- ============================================
+-- Le plan ne doit lister que les partitions du mois demandé :
+-- EXPLAIN SELECT COUNT(*) FROM events
+-- WHERE timestamp >= '2025-01-01' AND timestamp < '2025-02-01';
@@ -0,0 +1,14 @@
+-- Exercice 2 : Scores de conversion produits par batch_scoring.py
+-- ============================================
+-- Une ligne par session et par version de modèle. Alimentée en masse par
+-- COPY ; les sessions déjà scorées par la version courante sont ignorées
+-- au passage suivant.
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS session_scores (
+    session_id VARCHAR(50) NOT NULL,
+    model_version VARCHAR(100) NOT NULL,
+    probability REAL NOT NULL,
+    scored_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (session_id, model_version)
+);
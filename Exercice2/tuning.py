@@ -0,0 +1,254 @@
+"""
+Optimisation des hyperparamètres XGBoost par successive halving
+Exercice 2 - Remplace le GridSearchCV (729 combinaisons × 3 folds, entraînées jusqu'au bout)
+
+Ce script :
+1. Construit une seule fois les matrices XGBoost de chaque fold (QuantileDMatrix)
+2. Évalue toutes les combinaisons avec peu d'arbres, puis ne garde que le meilleur
+   tiers à chaque palier en multipliant le nombre d'arbres (early stopping sur le fold)
+3. Exécute les essais en parallèle (threads, nthread réparti entre les essais)
+4. Journalise chaque essai (JSON lines) pour pouvoir reprendre une recherche interrompue
+"""
+
+import hashlib
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import xgboost as xgb
+from sklearn.model_selection import StratifiedKFold
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# Même grille que le notebook, sans n_estimators : le nombre d'arbres est
+# donné par le palier et ajusté par l'early stopping
+DEFAULT_PARAM_GRID = {
+    'max_depth': [4, 6, 8],
+    'learning_rate': [0.01, 0.05, 0.1],
+    'subsample': [0.7, 0.8, 0.9],
+    'colsample_bytree': [0.7, 0.8, 0.9],
+    'min_child_weight': [1, 3, 5]
+}
+
+
+class SuccessiveHalvingSearch:
+
+    def __init__(self, param_grid: dict = None, base_params: dict = None,
+                 n_folds: int = 3, min_rounds: int = 25, max_rounds: int = 800,
+                 reduction: int = 3, early_stopping_rounds: int = 20,
+                 n_candidates: int = None, n_workers: int = None,
+                 log_path: str = None, random_state: int = 42):
+        """
+        Args:
+            param_grid: Grille de paramètres (défaut: DEFAULT_PARAM_GRID)
+            base_params: Paramètres fixes (ex: scale_pos_weight)
+            n_folds: Nombre de folds de validation croisée
+            min_rounds: Nombre d'arbres au premier palier
+            max_rounds: Nombre d'arbres maximal (dernier palier)
+            reduction: Facteur de réduction entre paliers (garde 1/reduction)
+            early_stopping_rounds: Patience de l'early stopping sur le fold de validation
+            n_candidates: Tirer au hasard ce nombre de combinaisons (défaut: toutes)
+            n_workers: Essais entraînés en parallèle (défaut: nombre de cœurs / 2)
+            log_path: Journal JSON lines des essais (reprise si le fichier existe ;
+                      seuls les essais faits sur les mêmes données, folds et
+                      base_params sont repris)
+            random_state: Graine (folds, tirage des combinaisons, XGBoost)
+        """
+        self.param_grid = param_grid or DEFAULT_PARAM_GRID
+        self.base_params = base_params or {}
+        self.n_folds = n_folds
+        self.min_rounds = min_rounds
+        self.max_rounds = max_rounds
+        self.reduction = reduction
+        self.early_stopping_rounds = early_stopping_rounds
+        self.n_candidates = n_candidates
+        self.n_workers = n_workers or max(1, (os.cpu_count() or 2) // 2)
+        self.log_path = log_path
+        self.random_state = random_state
+
+        # Threads XGBoost par essai : les cœurs sont partagés entre les
+        # essais parallèles au lieu d'être sur-souscrits
+        self.nthread = max(1, (os.cpu_count() or 1) // self.n_workers)
+
+        self._folds = []
+        self._empreinte = None
+        self._journal = {}
+        self._lock = threading.Lock()
+        self.history = []
+        self.best_params_ = None
+        self.best_score_ = None
+        self.best_iteration_ = None
+
+    # ============================================
+    # PRÉPARATION
+    # ============================================
+
+    def _preparer_folds(self, X, y):
+        """Construire une fois les matrices de chaque fold, partagées par tous les essais"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        y = np.ascontiguousarray(y)
+        self._empreinte = self._calculer_empreinte(X, y)
+        skf = StratifiedKFold(n_splits=self.n_folds, shuffle=True, random_state=self.random_state)
+        self._folds = []
+        for train_idx, valid_idx in skf.split(X, y):
+            dtrain = xgb.QuantileDMatrix(X[train_idx], y[train_idx])
+            # Même découpage en quantiles que le fold d'entraînement
+            dvalid = xgb.QuantileDMatrix(X[valid_idx], y[valid_idx], ref=dtrain)
+            self._folds.append((dtrain, dvalid))
+        logger.info(f"   ✓ {self.n_folds} folds préparés ({len(y)} lignes)")
+
+    def _candidats(self) -> list:
+        noms = sorted(self.param_grid)
+        combinaisons = [dict(zip(noms, valeurs))
+                        for valeurs in itertools.product(*(self.param_grid[n] for n in noms))]
+        if self.n_candidates and self.n_candidates < len(combinaisons):
+            combinaisons = random.Random(self.random_state).sample(combinaisons, self.n_candidates)
+        return combinaisons
+
+    # ============================================
+    # JOURNAL DES ESSAIS
+    # ============================================
+
+    def _calculer_empreinte(self, X: np.ndarray, y: np.ndarray) -> str:
+        """Empreinte du contexte d'un essai : données, découpage en folds et base_params"""
+        h = hashlib.sha256()
+        h.update(json.dumps({
+            'shape': list(X.shape),
+            'n_folds': self.n_folds,
+            'random_state': self.random_state,
+            'base_params': self.base_params,
+        }, sort_keys=True, default=str).encode('utf-8'))
+        # Tableaux contigus (voir _preparer_folds) : hachés sans copie
+        h.update(memoryview(X))
+        h.update(memoryview(y))
+        return h.hexdigest()
+
+    @staticmethod
+    def _cle(params: dict, rounds: int, empreinte: str) -> str:
+        return f"{empreinte}|{json.dumps(params, sort_keys=True)}|{rounds}"
+
+    def _charger_journal(self):
+        self._journal = {}
+        if not self.log_path or not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, 'r', encoding='utf-8') as f:
+            contenu = f.read()
+        if contenu and not contenu.endswith("\n"):
+            # Dernière ligne coupée par un arrêt en cours d'écriture : la
+            # terminer pour que le prochain essai journalisé ne s'y colle pas
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write("\n")
+
+        for numero, ligne in enumerate(contenu.splitlines(), 1):
+            if not ligne.strip():
+                continue
+            try:
+                essai = json.loads(ligne)
+            except ValueError:
+                logger.warning(f"  Ligne {numero} illisible dans {self.log_path} : ignorée")
+                continue
+            # Essais d'une autre recherche (autres données, folds ou base_params) ignorés
+            if essai.get('fingerprint') == self._empreinte:
+                self._journal[self._cle(essai['params'], essai['rounds'], self._empreinte)] = essai
+        logger.info(f"   ✓ {len(self._journal)} essais repris depuis {self.log_path}")
+
+    def _journaliser(self, essai: dict):
+        with self._lock:
+            self._journal[self._cle(essai['params'], essai['rounds'], essai['fingerprint'])] = essai
+            if self.log_path:
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(essai) + "\n")
+
+    # ============================================
+    # ESSAIS
+    # ============================================
+
+    def _evaluer(self, params: dict, rounds: int) -> dict:
+        """Entraîner une combinaison sur chaque fold (avec early stopping)"""
+        cle = self._cle(params, rounds, self._empreinte)
+        if cle in self._journal:
+            return self._journal[cle]
+
+        xgb_params = {
+            'objective': 'binary:logistic',
+            'eval_metric': 'auc',
+            'tree_method': 'hist',
+            'nthread': self.nthread,
+            'seed': self.random_state,
+            **self.base_params,
+            **params,
+        }
+        debut = time.perf_counter()
+        scores, iterations = [], []
+        for dtrain, dvalid in self._folds:
+            booster = xgb.train(
+                xgb_params, dtrain,
+                num_boost_round=rounds,
+                evals=[(dvalid, 'valid')],
+                early_stopping_rounds=self.early_stopping_rounds,
+                verbose_eval=False
+            )
+            scores.append(booster.best_score)
+            iterations.append(booster.best_iteration + 1)
+
+        essai = {
+            'fingerprint': self._empreinte,
+            'params': params,
+            'rounds': rounds,
+            'auc': float(np.mean(scores)),
+            'best_iteration': int(np.mean(iterations)),
+            'duration': round(time.perf_counter() - debut, 3),
+        }
+        self._journaliser(essai)
+        return essai
+
+    def fit(self, X, y) -> 'SuccessiveHalvingSearch':
+        """
+        Lancer la recherche
+
+        Returns:
+            self (best_params_, best_score_, best_iteration_ renseignés)
+        """
+        logger.info(" TUNING - Successive halving XGBoost")
+        self._preparer_folds(X, y)
+        self._charger_journal()
+
+        candidats = self._candidats()
+        palier = 0
+        with ThreadPoolExecutor(max_workers=self.n_workers) as pool:
+            while True:
+                rounds = min(self.max_rounds, self.min_rounds * self.reduction ** palier)
+                logger.info(f"   → Palier {palier}: {len(candidats)} combinaisons × {rounds} arbres")
+                # xgb.train libère le GIL : les threads s'exécutent réellement en parallèle
+                resultats = list(pool.map(lambda p: self._evaluer(p, rounds), candidats))
+                resultats.sort(key=lambda r: r['auc'], reverse=True)
+                self.history.extend(resultats)
+
+                if len(resultats) == 1 or rounds >= self.max_rounds:
+                    break
+                garder = max(1, math.ceil(len(resultats) / self.reduction))
+                candidats = [r['params'] for r in resultats[:garder]]
+                palier += 1
+
+        meilleur = resultats[0]
+        self.best_params_ = meilleur['params']
+        self.best_score_ = meilleur['auc']
+        self.best_iteration_ = meilleur['best_iteration']
+
+        nb_arbres = sum(r['rounds'] for r in self.history) * self.n_folds
+        logger.info(f"   ✓ Meilleur AUC (CV): {self.best_score_:.4f} "
+                    f"avec {self.best_iteration_} arbres - {len(self.history)} essais, "
+                    f"≤ {nb_arbres} arbres entraînés")
+        return self